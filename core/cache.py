@@ -0,0 +1,232 @@
+"""Кэш в SQLite-файле, общий для всех процессов одного хоста.
+
+Файл открывается в режиме WAL: чтения не блокируют запись, а запись
+другим процессом видна сразу. Размер ограничен числом записей
+(MAX_ENTRIES) и суммарным объёмом значений (MAX_SIZE); при превышении
+вытесняются давно не читавшиеся записи.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_stats VALUES (0, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_stats SET entries = entries + 1, size = size + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_stats SET entries = entries - 1, size = size - old.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache
+BEGIN
+    UPDATE cache_stats SET size = size - old.size + new.size;
+END;
+'''
+# Время последнего чтения обновляется не чаще раза в ACCESS_RESOLUTION
+# секунд, чтобы попадание в кэш почти никогда не требовало записи.
+ACCESS_RESOLUTION = 1.0
+# Не больше стольких параметров в одном запросе get_many.
+BATCH_SIZE = 500
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self._timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    def _connection(self):
+        """Соединение текущего потока; после fork открывается заново."""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=self._timeout,
+                                         isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            # Замена записи через INSERT OR REPLACE должна вызывать
+            # триггер удаления, иначе счётчики cache_stats разъедутся.
+            connection.execute('PRAGMA recursive_triggers=ON')
+            connection.executescript(SCHEMA)
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _dump(self, value):
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _fresh(self, expires, now):
+        return expires is None or expires > now
+
+    def _write(self, db, key, value, timeout, mode='REPLACE'):
+        data = self._dump(value)
+        cursor = db.execute(
+            f'INSERT OR {mode} INTO cache VALUES (?, ?, ?, ?, ?)',
+            (key, data, self.get_backend_timeout(timeout), time.time(),
+             len(data)))
+        return cursor.rowcount == 1
+
+    def _cull(self, db):
+        """Вытесняет давно не читавшиеся записи сверх лимитов."""
+        entries, size = db.execute(
+            'SELECT entries, size FROM cache_stats').fetchone()
+        if entries <= self._max_entries and size <= self._max_size:
+            return
+        db.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        entries, size = db.execute(
+            'SELECT entries, size FROM cache_stats').fetchone()
+        if entries > self._max_entries or size > self._max_size:
+            excess = max(entries - self._max_entries, 0)
+            cull = max(excess, entries // self._cull_frequency, 1)
+            db.execute('DELETE FROM cache WHERE key IN (SELECT key FROM '
+                       'cache ORDER BY accessed LIMIT ?)', (cull,))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        db = self._connection()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            db.execute('DELETE FROM cache WHERE key = ? AND expires <= ?',
+                       (key, time.time()))
+            added = self._write(db, key, value, timeout, mode='IGNORE')
+            if added:
+                self._cull(db)
+        return added
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._get_many([key]).get(key, default)
+
+    def _get_many(self, keys):
+        db = self._connection()
+        now = time.time()
+        rows = []
+        for start in range(0, len(keys), BATCH_SIZE):
+            batch = keys[start:start + BATCH_SIZE]
+            placeholders = ', '.join('?' * len(batch))
+            rows += db.execute(
+                f'SELECT key, value, expires, accessed FROM cache '
+                f'WHERE key IN ({placeholders})', batch).fetchall()
+        found, stale = {}, []
+        for key, value, expires, accessed in rows:
+            if not self._fresh(expires, now):
+                continue
+            found[key] = pickle.loads(value)
+            if now - accessed > ACCESS_RESOLUTION:
+                stale.append(key)
+        metrics.cache_requests.inc(len(found), result='hit')
+        metrics.cache_requests.inc(len(keys) - len(found), result='miss')
+        if stale:
+            with db:
+                db.executemany('UPDATE cache SET accessed = ? WHERE key = ?',
+                               [(now, key) for key in stale])
+        return found
+
+    def get_many(self, keys, version=None):
+        if not keys:
+            return {}
+        made = {self._key(key, version): key for key in keys}
+        found = self._get_many(list(made))
+        return {made[key]: value for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        db = self._connection()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            self._write(db, key, value, timeout)
+            self._cull(db)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        db = self._connection()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            for key, value in data.items():
+                self._write(db, self._key(key, version), value, timeout)
+            self._cull(db)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        db = self._connection()
+        with db:
+            cursor = db.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, time.time()))
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        db = self._connection()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            row = db.execute('SELECT value, expires FROM cache '
+                             'WHERE key = ?', (key,)).fetchone()
+            if row is None or not self._fresh(row[1], time.time()):
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            data = self._dump(value)
+            db.execute('UPDATE cache SET value = ?, size = ? WHERE key = ?',
+                       (data, len(data), key))
+        return value
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        db = self._connection()
+        with db:
+            db.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        db = self._connection()
+        with db:
+            db.executemany('DELETE FROM cache WHERE key = ?',
+                           [(key,) for key in keys])
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._connection().execute(
+            'SELECT expires FROM cache WHERE key = ?', (key,)).fetchone()
+        return row is not None and self._fresh(row[0], time.time())
+
+    def clear(self):
+        db = self._connection()
+        with db:
+            db.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединения живут всё время жизни потока, как у LocMemCache.
+        pass
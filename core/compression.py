@@ -0,0 +1,106 @@
+"""Сжатие ответов gzip с кэшем сжатых тел.
+
+Сжатие HTML ленты стоит миллисекунды процессора на каждый ответ, хотя
+тело чаще всего совпадает с уже отданным: страницы собираются из
+кэшированных фрагментов. Поэтому сжатое тело ответа с ETag кладётся в
+кэш по пути и ETag: сильный ETag условных страниц (posts.feed_cache)
+меняется вместе с содержимым. Декоратор conditional знает ETag ещё до
+вызова view и при попадании отдаёт сжатое тело, не отрисовывая
+страницу (cached_response).
+"""
+import gzip
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from .staticfiles import gzip_accepted
+
+KEY_PREFIX = 'gzip'
+COMPRESS_LEVEL = 6
+# Более короткие тела не сжимаются: выигрыш съест заголовок gzip.
+MIN_LENGTH = 200
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript',
+                      'application/xml', 'image/svg+xml')
+
+
+def compress(content):
+    # mtime=0: одинаковое тело даёт одинаковый архив.
+    return gzip.compress(content, COMPRESS_LEVEL, mtime=0)
+
+
+def etag_key(request, etag):
+    """Ключ сжатого тела: ETag уникален только в пределах адреса."""
+    key = f'{request.path}:{etag}'.encode()
+    return f'{KEY_PREFIX}:{hashlib.sha256(key).hexdigest()}'
+
+
+def cacheable(request, response):
+    """Сжатое тело можно переиспользовать, если ответ условный (ETag
+    ставят ленты) и не несёт ничего личного: токена CSRF и cookie."""
+    return (response.has_header('ETag') and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED'))
+
+
+def compressed_content(request, response):
+    content = response.content
+    if not cacheable(request, response):
+        return compress(content)
+    key = etag_key(request, response['ETag'])
+    found = cache.get(key)
+    if found is not None:
+        return found[1]
+    compressed = compress(content)
+    if len(compressed) < len(content):
+        cache.set(key, (response['Content-Type'], compressed),
+                  settings.COMPRESSION_CACHE_TIMEOUT)
+    return compressed
+
+
+def cached_response(request, etag):
+    """Готовый сжатый ответ страницы с этим ETag из кэша или None.
+
+    Кэшируются только ответы без личных данных, а ETag однозначно
+    задаёт тело, поэтому страницу можно не отрисовывать.
+    """
+    if not gzip_accepted(request):
+        return None
+    found = cache.get(etag_key(request, etag))
+    if found is None:
+        return None
+    content_type, compressed = found
+    response = HttpResponse(compressed, content_type=content_type)
+    return encoded(response, etag)
+
+
+def encoded(response, etag):
+    """Заголовки сжатого ответа."""
+    response['Content-Length'] = str(len(response.content))
+    # Как и GZipMiddleware: сжатое тело — другое представление, поэтому
+    # сильный ETag становится слабым; If-None-Match сравнивает слабо.
+    if etag and etag.startswith('"'):
+        response['ETag'] = f'W/{etag}'
+    response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def compress_response(request, response):
+    """Сжимает тело ответа, если клиент принимает gzip. Потоковые
+    ответы не трогаются: статику сжимает collectstatic (core.staticfiles).
+    """
+    content_type = response.get('Content-Type', '').lower()
+    if (response.status_code != 200 or response.streaming
+            or response.has_header('Content-Encoding')
+            or not content_type.startswith(COMPRESSIBLE_TYPES)):
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if not gzip_accepted(request) or len(response.content) < MIN_LENGTH:
+        return response
+    compressed = compressed_content(request, response)
+    if len(compressed) >= len(response.content):
+        return response
+    response.content = compressed
+    return encoded(response, response.get('ETag'))
@@ -0,0 +1,63 @@
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'filebased': 'django.core.cache.backends.filebased.FileBasedCache',
+    'sqlite': 'core.cache.SQLiteCache',
+}
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает задержку попадания в кэш для разных бэкендов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=int, default=1000)
+        parser.add_argument('--reads', type=int, default=20000)
+        parser.add_argument('--value-size', type=int, default=2048)
+
+    def make_cache(self, name, directory):
+        location = os.path.join(directory, name)
+        if name == 'sqlite':
+            location = os.path.join(directory, 'cache.sqlite3')
+        return import_string(BACKENDS[name])(
+            location, {'OPTIONS': {'MAX_ENTRIES': 10 ** 6}, 'TIMEOUT': None})
+
+    def measure(self, cache, keys, reads):
+        value = 'x' * self.value_size
+        for key in keys:
+            cache.set(key, value)
+        timings = []
+        for i in range(reads):
+            key = keys[i % len(keys)]
+            start = time.perf_counter()
+            cache.get(key)
+            timings.append((time.perf_counter() - start) * 10 ** 6)
+        timings.sort()
+        return {
+            'mean': statistics.mean(timings),
+            'p50': timings[len(timings) // 2],
+            'p95': timings[int(len(timings) * 0.95)],
+        }
+
+    def handle(self, *args, **options):
+        self.value_size = options['value_size']
+        keys = [f'bench:{i}' for i in range(options['keys'])]
+        self.stdout.write(f'{"backend":<10} {"mean, мкс":>10} '
+                          f'{"p50, мкс":>10} {"p95, мкс":>10}')
+        for name in BACKENDS:
+            directory = tempfile.mkdtemp()
+            try:
+                result = self.measure(self.make_cache(name, directory),
+                                      keys, options['reads'])
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+            self.stdout.write(f'{name:<10} {result["mean"]:>10.1f} '
+                              f'{result["p50"]:>10.1f} '
+                              f'{result["p95"]:>10.1f}')
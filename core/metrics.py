@@ -0,0 +1,297 @@
+"""Счётчики и гистограммы в памяти процесса.
+
+Каждый процесс не чаще раза в METRICS_FLUSH_INTERVAL секунд сбрасывает
+свои значения в файл METRICS_DIR/<pid>-<время запуска>.json; страница
+метрик складывает файлы всех процессов и отдаёт сумму в текстовом
+формате Prometheus. Время запуска в имени не даёт новому процессу с
+тем же pid затереть файл завершившегося. Файлы завершившихся процессов
+страница метрик переносит в общий RETIRED, чтобы счётчики не убывали,
+а файлов не становилось всё больше; каталог очищается при
+развёртывании.
+"""
+import atexit
+import bisect
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+# Границы корзин гистограмм длительности, в секундах.
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                    0.5, 1, 2.5, 5, 10)
+# Сумма значений завершившихся процессов и имена уже учтённых в ней
+# файлов.
+RETIRED = 'retired.json'
+PROCESS_FILE = re.compile(r'^(\d+)-(\d+)\.json$')
+
+
+def start_time(pid):
+    """Время запуска процесса в тиках с загрузки системы из /proc или
+    None, если процесса нет или /proc недоступен."""
+    try:
+        with open(f'/proc/{pid}/stat') as stat:
+            fields = stat.read().rsplit(')', 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    return int(fields[19])
+
+
+def write_json(path, data):
+    """Атомарно заменяет файл; у каждой записи свой временный файл."""
+    directory, name = os.path.split(path)
+    descriptor, temporary = tempfile.mkstemp(prefix=f'.{name}.',
+                                             suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(descriptor, 'w') as output:
+            json.dump(data, output)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def read_json(path):
+    try:
+        with open(path) as source:
+            return json.load(source)
+    except (OSError, ValueError):
+        return None
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        # Снимок и его запись идут под одной блокировкой, чтобы более
+        # старый снимок не записался поверх нового (сброс при выходе).
+        self.flush_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Обнуляет значения: после fork ребёнок не должен повторно
+        отчитываться за то, что насчитал родитель."""
+        self.pid = os.getpid()
+        # Без /proc время запуска заменяется временем первого отчёта.
+        started = start_time(self.pid) or int(time.time())
+        self.filename = f'{self.pid}-{started}.json'
+        self.values = {}
+        self.flushed = time.monotonic()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def update(self, name, labels, change):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.reset()
+            series = self.values.setdefault(name, {})
+            key = tuple(sorted(labels.items()))
+            series[key] = change(series.get(key))
+            now = time.monotonic()
+            due = now - self.flushed > settings.METRICS_FLUSH_INTERVAL
+            if due:
+                # Сброс занимается под блокировкой: другие потоки его
+                # уже не начнут.
+                self.flushed = now
+        if due:
+            self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.reset()
+            # Списки гистограмм копируются: их меняют другие потоки.
+            return {name: [[dict(key), value.copy()
+                            if isinstance(value, list) else value]
+                           for key, value in series.items()]
+                    for name, series in self.values.items()}
+
+    def flush(self):
+        """Сбрасывает значения процесса в его файл."""
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        with self.flush_lock:
+            data = self.snapshot()
+            self.flushed = time.monotonic()
+            os.makedirs(directory, exist_ok=True)
+            write_json(os.path.join(directory, self.filename), data)
+
+    def retire(self, directory):
+        """Переносит значения завершившихся процессов в RETIRED.
+
+        Файл процесса устарел, если процесса с его pid нет или он
+        запущен в другое время. Имена перенесённых файлов запоминаются
+        в RETIRED до их удаления, чтобы сбой между записью и удалением
+        не учёл их дважды. Работает только при доступном /proc.
+        """
+        if start_time(os.getpid()) is None:
+            return
+        import fcntl
+        with open(os.path.join(directory, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            path = os.path.join(directory, RETIRED)
+            retired = read_json(path) or {'values': {}, 'files': []}
+            for name in retired['files']:
+                if os.path.exists(os.path.join(directory, name)):
+                    os.remove(os.path.join(directory, name))
+            stale = {}
+            for name in os.listdir(directory):
+                match = PROCESS_FILE.match(name)
+                if match and start_time(match[1]) != int(match[2]):
+                    stale[name] = read_json(os.path.join(directory, name))
+            if not stale:
+                return
+            total = self.merge([retired['values'],
+                                *filter(None, stale.values())])
+            write_json(path, {
+                'values': {name: [[dict(key), value]
+                                  for key, value in series.items()]
+                           for name, series in total.items()},
+                'files': list(stale),
+            })
+            for name in stale:
+                os.remove(os.path.join(directory, name))
+
+    def collect(self):
+        """Значения всех процессов: {имя: {метки: значение}}."""
+        snapshots = [self.snapshot()]
+        directory = settings.METRICS_DIR
+        if directory and os.path.isdir(directory):
+            self.retire(directory)
+            retired = read_json(os.path.join(directory, RETIRED))
+            if retired:
+                snapshots.append(retired['values'])
+            for name in os.listdir(directory):
+                if not PROCESS_FILE.match(name) or name == self.filename:
+                    continue
+                snapshot = read_json(os.path.join(directory, name))
+                if snapshot is not None:
+                    snapshots.append(snapshot)
+        return self.merge(snapshots)
+
+    def merge(self, snapshots):
+        """Сумма снимков: {имя: {метки: значение}}."""
+        total = {}
+        for snapshot in snapshots:
+            for name, series in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                merged = total.setdefault(name, {})
+                for labels, value in series:
+                    key = tuple(sorted(labels.items()))
+                    merged[key] = metric.merge(merged.get(key), value)
+        return total
+
+    def expose(self):
+        """Текстовый формат Prometheus."""
+        values = self.collect()
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for key, value in sorted(values.get(name, {}).items()):
+                lines.extend(metric.lines(dict(key), value))
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\')
+                         .replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in sorted(labels.items()))
+    return f'{{{pairs}}}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, registry):
+        self.name = name
+        self.documentation = documentation
+        self.registry = registry
+        registry.register(self)
+
+    def inc(self, amount=1, **labels):
+        self.registry.update(self.name, labels,
+                             lambda value: (value or 0) + amount)
+
+    def merge(self, total, value):
+        return (total or 0) + value
+
+    def lines(self, labels, value):
+        return [f'{self.name}{format_labels(labels)} {value}']
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами.
+
+    Значение ряда — список: число наблюдений в каждой корзине (последняя
+    — выше всех границ), затем сумма наблюдений.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, registry,
+                 buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.registry = registry
+        registry.register(self)
+
+    def observe(self, value, **labels):
+        index = bisect.bisect_left(self.buckets, value)
+
+        def change(current):
+            current = current or [0] * (len(self.buckets) + 2)
+            current[index] += 1
+            current[-1] += value
+            return current
+
+        self.registry.update(self.name, labels, change)
+
+    def merge(self, total, value):
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+
+    def lines(self, labels, value):
+        lines = []
+        cumulative = 0
+        bounds = [*map(str, self.buckets), '+Inf']
+        for bound, count in zip(bounds, value):
+            cumulative += count
+            lines.append(f'{self.name}_bucket'
+                         f'{format_labels({**labels, "le": bound})} '
+                         f'{cumulative}')
+        lines.append(f'{self.name}_sum{format_labels(labels)} {value[-1]}')
+        lines.append(f'{self.name}_count{format_labels(labels)} '
+                     f'{cumulative}')
+        return lines
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+requests = Counter('yatube_requests_total',
+                   'Ответы по представлениям, методам и кодам', registry)
+request_seconds = Histogram('yatube_request_duration_seconds',
+                            'Время ответа представления', registry)
+db_seconds = Histogram('yatube_db_duration_seconds',
+                       'Время SQL-запросов за ответ', registry)
+db_queries = Counter('yatube_db_queries_total',
+                     'SQL-запросы по представлениям', registry)
+template_seconds = Histogram('yatube_template_render_seconds',
+                             'Время отрисовки шаблона', registry)
+cache_requests = Counter('yatube_cache_requests_total',
+                         'Чтения кэша: попадания и промахи', registry)
+thumbnail_seconds = Histogram('yatube_thumbnail_seconds',
+                              'Время создания миниатюры', registry)
@@ -0,0 +1,106 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import compression, metrics, profiling
+from .queries import QueryBudgetExceeded, QueryLog
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """Считает ответы, их время и время БД по представлениям.
+
+    Стоит первой, чтобы к её возврату QueryBudgetMiddleware уже
+    досчитала запросы к БД.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        metrics.requests.inc(view=view, method=request.method,
+                             status=response.status_code)
+        metrics.request_seconds.observe(elapsed, view=view)
+        log = getattr(request, 'query_log', None)
+        if log is not None:
+            metrics.db_seconds.observe(log.duration, view=view)
+            metrics.db_queries.inc(log.count, view=view)
+        return response
+
+
+class QueryBudgetMiddleware:
+    """Считает запросы и время БД, отдаёт их в заголовке Server-Timing.
+
+    Повторяющиеся формы запросов пишутся в лог как вероятные N+1.
+    Превышение бюджета, объявленного декоратором query_budget, тоже
+    пишется в лог, а при QUERY_BUDGET_RAISE поднимает исключение —
+    так тесты падают на регрессиях.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        log = request.query_log = QueryLog()
+        request.query_budget = None
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(log))
+            response = self.get_response(request)
+        response['Server-Timing'] = (
+            f'db;dur={log.duration * 1000:.2f};desc="{log.count} queries"')
+        self.check(request, log)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, 'query_budget', None)
+
+    def check(self, request, log):
+        for sql, count in log.repeated(settings.QUERY_REPEAT_THRESHOLD):
+            logger.warning('Вероятный N+1 на %s: %d раз %s',
+                           request.path, count, sql)
+        budget = request.query_budget
+        if budget is None or log.count <= budget:
+            return
+        message = (f'{request.path}: {log.count} запросов '
+                   f'при бюджете {budget}')
+        if settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class ProfilingMiddleware:
+    """Профилирует запрос сотрудника, попросившего об этом заголовком
+    X-Profile: 1 или параметром ?_profile=1; см. core.profiling."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if profiling.requested(request):
+            return profiling.run(request, self.get_response)
+        return self.get_response(request)
+
+
+class CompressionMiddleware:
+    """Сжимает ответы gzip; сжатые тела условных страниц берутся из
+    кэша (см. core.compression).
+
+    Стоит раньше сессий и CSRF, чтобы видеть выставленные ими cookie.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return compression.compress_response(request,
+                                             self.get_response(request))
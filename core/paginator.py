@@ -0,0 +1,40 @@
+"""Постраничный вывод без точного COUNT(*) по большим таблицам."""
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+# Дальше этого числа строки отфильтрованной выборки не пересчитываются.
+COUNT_LIMIT = 10000
+
+
+def estimate_count(model, using='default'):
+    """Примерное число строк таблицы без её полного просмотра.
+
+    В SQLite это наибольший id — чтение конца индекса; удалённые строки
+    дают завышенную оценку. В PostgreSQL — статистика планировщика.
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s',
+                           [model._meta.db_table])
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return int(row[0])
+    if connection.vendor in ('sqlite', 'postgresql'):
+        return (model._default_manager.using(using)
+                .aggregate(last=Max('pk'))['last'] or 0)
+    return model._default_manager.using(using).count()
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator для админки: для всей таблицы число строк оценивается,
+    а отфильтрованная выборка считается не дальше COUNT_LIMIT строк."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            return estimate_count(queryset.model, queryset.db)
+        return queryset[:COUNT_LIMIT].count()
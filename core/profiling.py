@@ -0,0 +1,125 @@
+"""Профилирование отдельных запросов по требованию сотрудников.
+
+Для запроса сохраняются три файла в PROFILE_DIR: дамп cProfile
+(.prof, открывается pstats или snakeviz), его текстовая сводка и
+сводка выделений памяти tracemalloc (.alloc.txt).
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import tracemalloc
+from datetime import datetime
+
+from django.conf import settings
+
+# Сколько строк оставлять в текстовых сводках.
+TOP = 40
+EXTENSIONS = ('.prof', '.txt', '.alloc.txt')
+NAME = re.compile(r'^[\w.-]+$')
+
+# tracemalloc общий для процесса: его останавливает последний из
+# одновременно профилируемых запросов, и только если запускали его мы.
+_lock = threading.Lock()
+_active = 0
+_started_tracing = False
+
+
+def requested(request):
+    """Сотрудник попросил профиль заголовком X-Profile или ?_profile=1."""
+    flag = (request.META.get('HTTP_X_PROFILE')
+            or request.GET.get('_profile'))
+    user = getattr(request, 'user', None)
+    return flag == '1' and user is not None and user.is_staff
+
+
+def run(request, get_response):
+    """Выполняет запрос под cProfile и tracemalloc, сохраняет файлы.
+
+    tracemalloc общий для процесса: в сводку могут попасть выделения
+    других потоков, обслуживавших запросы в то же время.
+    """
+    start_tracing()
+    profiler = cProfile.Profile()
+    try:
+        before = tracemalloc.take_snapshot()
+        response = profiler.runcall(get_response, request)
+        after = tracemalloc.take_snapshot()
+    finally:
+        stop_tracing()
+    name = save(request, profiler, after.compare_to(before, 'lineno'))
+    response['X-Profile-Id'] = name
+    return response
+
+
+def start_tracing():
+    global _active, _started_tracing
+    with _lock:
+        if not _active and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _active += 1
+
+
+def stop_tracing():
+    global _active, _started_tracing
+    with _lock:
+        _active -= 1
+        if not _active and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+def save(request, profiler, allocations):
+    directory = settings.PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    slug = re.sub(r'[^\w-]+', '-', request.path).strip('-') or 'root'
+    name = f'{datetime.now():%Y%m%d-%H%M%S-%f}-{slug[:60]}'
+    base = os.path.join(directory, name)
+    profiler.dump_stats(f'{base}.prof')
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats(
+        'cumulative').print_stats(TOP)
+    with open(f'{base}.txt', 'w') as output:
+        output.write(f'{request.method} {request.get_full_path()}\n')
+        output.write(summary.getvalue())
+    with open(f'{base}.alloc.txt', 'w') as output:
+        for stat in allocations[:TOP]:
+            output.write(f'{stat}\n')
+    prune(directory)
+    return name
+
+
+def artifacts():
+    """Сохранённые файлы, новые первыми: (имя, размер, время)."""
+    directory = settings.PROFILE_DIR
+    if not os.path.isdir(directory):
+        return []
+    entries = [entry for entry in os.scandir(directory)
+               if entry.is_file() and entry.name.endswith(EXTENSIONS)]
+    entries.sort(key=lambda entry: entry.name, reverse=True)
+    return [(entry.name, entry.stat().st_size,
+             datetime.fromtimestamp(entry.stat().st_mtime))
+            for entry in entries]
+
+
+def path(name):
+    """Путь к файлу профиля или None для чужих и несуществующих имён."""
+    if not NAME.match(name) or not name.endswith(EXTENSIONS):
+        return None
+    full = os.path.join(settings.PROFILE_DIR, name)
+    return full if os.path.isfile(full) else None
+
+
+def prune(directory):
+    """Оставляет файлы только последних PROFILE_KEEP запросов."""
+    names = sorted({name.split('.')[0] for name, _, _ in artifacts()},
+                   reverse=True)
+    for name in names[settings.PROFILE_KEEP:]:
+        for extension in EXTENSIONS:
+            try:
+                os.remove(os.path.join(directory, name + extension))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,50 @@
+"""Учёт SQL-запросов запроса: число, время и повторяющиеся формы."""
+import re
+import time
+from collections import Counter
+
+# Списки IN (%s, %s, ...) разной длины считаются одной формой запроса.
+IN_LIST = re.compile(r'\((?:%s|\?)(?:\s*,\s*(?:%s|\?))*\)')
+
+
+class QueryBudgetExceeded(Exception):
+    """Представление выполнило больше запросов, чем ему разрешено."""
+
+
+def shape(sql):
+    return IN_LIST.sub('(...)', sql)
+
+
+class QueryLog:
+    """Обёртка для connection.execute_wrapper, считающая запросы."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.shapes[shape(sql)] += 1
+
+    def repeated(self, threshold):
+        """Формы, выполненные не меньше threshold раз: вероятные N+1."""
+        return [(sql, count) for sql, count in self.shapes.most_common()
+                if count >= threshold]
+
+
+def query_budget(limit):
+    """Объявляет, сколько SQL-запросов может выполнить представление.
+
+    Проверяет QueryBudgetMiddleware; атрибут переживает декораторы,
+    построенные на functools.wraps.
+    """
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
@@ -0,0 +1,92 @@
+"""Статика с хешем в имени и заранее сжатыми копиями.
+
+collectstatic записывает каждый файл ещё и под именем с хешем
+содержимого (bootstrap.min.55a4b2c1e9f0.css) и кладёт рядом .gz для
+текстовых форматов. Такие имена не меняются без изменения файла,
+поэтому отдаются с годовым Cache-Control: immutable (см.
+core.views.static_file).
+"""
+import gzip
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.txt', '.html', '.json',
+                '.xml', '.ico', '.eot', '.ttf', '.otf')
+# Копия не пишется, если экономит меньше этой доли размера.
+MIN_SAVING = 0.05
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+
+def compress(path):
+    """Пишет path.gz, если сжатие того стоит; возвращает его путь."""
+    with open(path, 'rb') as source:
+        content = source.read()
+    # mtime=0: одинаковый файл даёт одинаковый архив при каждой сборке.
+    compressed = gzip.compress(content, compresslevel=9, mtime=0)
+    if len(compressed) > len(content) * (1 - MIN_SAVING):
+        return None
+    with open(f'{path}.gz.tmp', 'wb') as output:
+        output.write(compressed)
+    os.replace(f'{path}.gz.tmp', f'{path}.gz')
+    return f'{path}.gz'
+
+
+def is_hashed(name):
+    return bool(HASHED_NAME.search(name))
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хеш в именах и .gz-копии; без манифеста или без файла ссылки
+    ведут на исходное имя, а не падают, — так шаблоны работают и до
+    первого collectstatic, например в тестах."""
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        # CSS переписывается в несколько проходов, поэтому сжимается
+        # уже окончательный вариант — после всех проходов.
+        stored = set()
+        for name, hashed_name, processed in super().post_process(
+                paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                stored.update((name, hashed_name))
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(stored):
+            if name.lower().endswith(COMPRESSIBLE):
+                compress(self.path(name))
+
+
+def gzip_accepted(request):
+    """Принимает ли клиент gzip по Accept-Encoding; q=0 — отказ, а
+    явное gzip важнее *."""
+    qualities = {}
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = item.partition(';')
+        quality = 1.0
+        params = params.strip().replace(' ', '')
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    return qualities.get('gzip', qualities.get('*', 0.0)) > 0
+
+
+def static_path(name):
+    """Путь к файлу в STATIC_ROOT или None, если имя выходит за него."""
+    root = os.path.abspath(settings.STATIC_ROOT)
+    path = os.path.abspath(os.path.join(root, name))
+    if not path.startswith(root + os.sep):
+        return None
+    return path
@@ -0,0 +1,75 @@
+"""Хранилище файлов с именами по содержимому.
+
+Файл сохраняется под именем <каталог>/<ab>/<cd>/<sha256><расширение>,
+где каталог берётся из upload_to. Одинаковые файлы получают одно имя
+и записываются один раз; повторная загрузка только возвращает имя.
+Удалять такой файл можно, лишь когда на него не ссылается ни одна
+запись, — за этим следят счётчики ссылок (см. posts.media).
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def hashed_name(self, name, content):
+        directory, basename = os.path.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        digest = content_hash(content)
+        return os.path.join(directory, digest[:2], digest[2:4],
+                            f'{digest}{extension}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if not self.exists(name):
+            self._save(name, content)
+        return name.replace('\\', '/')
+
+    def _save(self, name, content):
+        """Пишет во временный файл рядом и переименовывает: одинаковое
+        содержимое, записанное двумя процессами сразу, даёт тот же файл,
+        а не второй с суффиксом, как у FileSystemStorage."""
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        if self.directory_permissions_mode is not None:
+            os.chmod(directory, self.directory_permissions_mode)
+        descriptor, temporary = tempfile.mkstemp(dir=directory,
+                                                 prefix='.upload-')
+        try:
+            if hasattr(content, 'temporary_file_path'):
+                os.close(descriptor)
+                file_move_safe(content.temporary_file_path(), temporary,
+                               allow_overwrite=True)
+            else:
+                with os.fdopen(descriptor, 'wb') as output:
+                    for chunk in content.chunks():
+                        output.write(chunk)
+            os.chmod(temporary, self.file_permissions_mode or 0o644)
+            os.replace(temporary, full_path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return name
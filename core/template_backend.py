@@ -0,0 +1,27 @@
+import time
+
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import metrics
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            name = self.origin.template_name or '<string>'
+            metrics.template_seconds.observe(time.perf_counter() - start,
+                                             template=name)
+
+
+class TimedTemplates(DjangoTemplates):
+    """Шаблоны Django, замеряющие время отрисовки каждого шаблона."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
@@ -0,0 +1,65 @@
+"""Загрузчики шаблонов, убирающие отступы и пустые строки.
+
+Отступы вложенных блоков занимают заметную долю HTML ленты. Они
+убираются из исходника шаблона при загрузке, так что кэширующий
+загрузчик хранит уже очищенный шаблон и отрисовка ничего не стоит.
+Переносы строк остаются: между строчными элементами сохраняется
+пробел; убираются только переносы после строк из одних управляющих
+тегов, иначе от {% if %} оставались бы пустые строки. Шаблоны, где
+пробелы значимы, не трогаются.
+"""
+from django.conf import settings
+from django.template.base import (BLOCK_TAG_START, COMMENT_TAG_START,
+                                  tag_re)
+from django.template.loaders import app_directories, filesystem
+
+PRESERVE_MARKERS = ('<pre', '<textarea', '{% verbatim', 'blocktrans')
+# Теги, которые сами ничего не выводят.
+CONTROL_TAGS = frozenset((
+    'if', 'elif', 'else', 'endif', 'for', 'empty', 'endfor', 'with',
+    'endwith', 'block', 'endblock', 'extends', 'load', 'cache', 'endcache',
+    'comment', 'endcomment'))
+
+
+def control_only(line):
+    """Строка состоит только из управляющих тегов и комментариев,
+    разделённых пробелами. Теги ищутся тем же выражением, что и в
+    лексере шаблонов, так что строки и знаки % внутри тегов не мешают."""
+    for index, part in enumerate(tag_re.split(line)):
+        if index % 2 == 0:
+            if part.strip():
+                return False
+        elif part.startswith(BLOCK_TAG_START):
+            words = part[2:-2].split()
+            if not words or words[0] not in CONTROL_TAGS:
+                return False
+        elif not part.startswith(COMMENT_TAG_START):
+            return False
+    return True
+
+
+def strip_whitespace(source):
+    if any(marker in source for marker in PRESERVE_MARKERS):
+        return source
+    stripped = []
+    for line in source.splitlines():
+        line = line.strip()
+        if line:
+            stripped.append(line if control_only(line) else line + '\n')
+    return ''.join(stripped)
+
+
+class StripWhitespaceMixin:
+    def get_contents(self, origin):
+        contents = super().get_contents(origin)
+        if settings.TEMPLATE_STRIP_WHITESPACE:
+            return strip_whitespace(contents)
+        return contents
+
+
+class FilesystemLoader(StripWhitespaceMixin, filesystem.Loader):
+    pass
+
+
+class AppDirectoriesLoader(StripWhitespaceMixin, app_directories.Loader):
+    pass
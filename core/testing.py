@@ -0,0 +1,70 @@
+"""Настройки, изолирующие тесты от данных разработчика.
+
+Кэш по умолчанию живёт в файле (core.cache.SQLiteCache), а метрики
+процессов пишутся в METRICS_DIR: без подмены тесты очищали бы
+настоящий кэш и делили бы состояние между запусками. Подмену включают
+тестовый раннер manage.py test и conftest тестов pytest; замеры
+производительности берут свой временный кэш через private_cache.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+def isolate():
+    """Переносит кэш во временный каталог и отключает запись метрик до
+    конца процесса: метрики сбрасываются в файл ещё и при выходе, уже
+    после завершения тестов (core.metrics)."""
+    directory = tempfile.mkdtemp(prefix='yatube-tests-')
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    override_settings(
+        CACHES=caches_in(directory),
+        # Тесты метрик подставляют свой временный каталог.
+        METRICS_DIR=None,
+    ).enable()
+
+
+def caches_in(directory):
+    """CACHES с файлом кэша по умолчанию в directory."""
+    return {'default': {
+        **settings.CACHES['default'],
+        'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+    }}
+
+
+@contextmanager
+def private_cache():
+    """Временный кэш по умолчанию на время блока: его можно очищать, не
+    трогая общий кэш процессов хоста."""
+    with tempfile.TemporaryDirectory(prefix='yatube-cache-') as directory:
+        with override_settings(CACHES=caches_in(directory)):
+            yield
+
+
+class IsolatedTestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        isolate()
+
+
+@contextmanager
+def run_on_commit(using=DEFAULT_DB_ALIAS):
+    """Выполняет колбэки transaction.on_commit, поставленные внутри
+    блока. В TestCase транзакция теста не фиксируется, и без этого они
+    не выполнились бы никогда; то же делает captureOnCommitCallbacks
+    из Django 3.2."""
+    start = len(connections[using].run_on_commit)
+    yield
+    # Колбэки могут ставить новые колбэки.
+    while len(connections[using].run_on_commit) > start:
+        callbacks = connections[using].run_on_commit[start:]
+        start = len(connections[using].run_on_commit)
+        for _, callback in callbacks:
+            callback()
@@ -0,0 +1,92 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.cache import SQLiteCache
+
+
+def write_in_child(location):
+    SQLiteCache(location, {}).set('from_child', 'значение')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_set_get_delete(self):
+        """Значения сохраняются, читаются и удаляются."""
+        self.cache.set('key', {'a': 1})
+        self.assertEqual(self.cache.get('key'), {'a': 1})
+        self.assertTrue(self.cache.has_key('key'))
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_add_and_incr(self):
+        """add не перезаписывает значение, incr увеличивает его."""
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.cache.add('counter', 5))
+        self.assertEqual(self.cache.incr('counter'), 2)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_expiry(self):
+        """Просроченные записи не возвращаются."""
+        self.cache.set('key', 'value', timeout=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+
+    def test_get_set_many(self):
+        """get_many читает несколько ключей одним запросом."""
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']),
+                         {'a': 1, 'b': 2})
+
+    def test_shared_between_processes(self):
+        """Запись из другого процесса видна сразу."""
+        context = multiprocessing.get_context('fork')
+        process = context.Process(target=write_in_child,
+                                  args=(self.location,))
+        process.start()
+        process.join()
+        self.assertEqual(self.cache.get('from_child'), 'значение')
+        self.make_cache().clear()
+        self.assertIsNone(self.cache.get('from_child'))
+
+    @mock.patch('core.cache.ACCESS_RESOLUTION', -1)
+    def test_lru_eviction_by_entries(self):
+        """При переполнении вытесняются давно не читавшиеся записи."""
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        for key in ['a', 'b', 'c']:
+            cache.set(key, key)
+        cache.get('a')
+        cache.set('d', 'd')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get_many(['a', 'c', 'd']),
+                         {'a': 'a', 'c': 'c', 'd': 'd'})
+
+    def test_eviction_by_size(self):
+        """Суммарный объём значений не превышает MAX_SIZE."""
+        cache = self.make_cache(MAX_SIZE=10000)
+        for i in range(20):
+            cache.set(f'key{i}', 'x' * 1000)
+        db = cache._connection()
+        entries, size = db.execute(
+            'SELECT entries, size FROM cache_stats').fetchone()
+        self.assertLessEqual(size, 10000)
+        self.assertEqual(entries, db.execute(
+            'SELECT COUNT(*) FROM cache').fetchone()[0])
+        self.assertIsNotNone(cache.get('key19'))
@@ -0,0 +1,115 @@
+import gzip
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import compression
+from core.middleware import CompressionMiddleware
+from core.template_loaders import strip_whitespace
+
+BODY = ('<html><body>' + '<p>Пост</p>\n' * 100 + '</body></html>').encode()
+LOCMEM = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'compression-tests',
+}}
+
+
+@override_settings(CACHES=LOCMEM)
+class CompressionMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        compression.cache.clear()
+        self.factory = RequestFactory()
+
+    def call(self, encoding='gzip', etag='"feed"', body=BODY, **meta):
+        def view(request):
+            response = HttpResponse(body)
+            if etag:
+                response['ETag'] = etag
+            return response
+        if encoding is not None:
+            meta['HTTP_ACCEPT_ENCODING'] = encoding
+        request = self.factory.get('/', **meta)
+        return CompressionMiddleware(view)(request)
+
+    def test_compressed(self):
+        """Ответ сжимается, ETag становится слабым, Vary учитывает
+        Accept-Encoding."""
+        response = self.call()
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), BODY)
+        self.assertEqual(response['Content-Length'],
+                         str(len(response.content)))
+        self.assertEqual(response['ETag'], 'W/"feed"')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_not_accepted(self):
+        """Без gzip в Accept-Encoding или с q=0 тело не сжимается."""
+        for encoding in (None, 'br', 'gzip;q=0'):
+            with self.subTest(encoding=encoding):
+                response = self.call(encoding)
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertEqual(response.content, BODY)
+                self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_short_body(self):
+        """Короткие тела не сжимаются."""
+        response = self.call(body=b'<p>post</p>')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_cached_body_reused(self):
+        """Повторный такой же ответ с ETag не сжимается заново."""
+        first = self.call()
+        with mock.patch.object(compression, 'compress') as compress:
+            second = self.call()
+        compress.assert_not_called()
+        self.assertEqual(second.content, first.content)
+
+    def test_private_responses_not_cached(self):
+        """Ответы без ETag и с токеном CSRF сжимаются каждый раз."""
+        for options in ({'etag': None}, {'CSRF_COOKIE_USED': True}):
+            with self.subTest(options=options):
+                self.call(**options)
+                with mock.patch.object(compression, 'compress',
+                                       wraps=compression.compress) as spy:
+                    response = self.call(**options)
+                spy.assert_called_once()
+                self.assertEqual(gzip.decompress(response.content), BODY)
+
+
+class StripWhitespaceTests(SimpleTestCase):
+    def test_stripped(self):
+        """Отступы и пустые строки убираются, переносы остаются."""
+        source = '<div>\n    <p>{{ post.text }}</p>\n\n    <a>x</a>\n</div>\n'
+        self.assertEqual(strip_whitespace(source),
+                         '<div>\n<p>{{ post.text }}</p>\n<a>x</a>\n</div>\n')
+
+    def test_control_tag_lines_joined(self):
+        """Строки из одних управляющих тегов не оставляют пустых строк."""
+        source = '{% if a %}\n  <p>a</p>\n{% endif %}\n<p>b</p>\n'
+        self.assertEqual(strip_whitespace(source),
+                         '{% if a %}<p>a</p>\n{% endif %}<p>b</p>\n')
+
+    def test_control_tag_lines_recognised(self):
+        """Управляющими считаются строки из нескольких тегов через пробел,
+        с комментариями и со знаком % внутри тега; строки с выводом
+        переносов не теряют."""
+        source = ('{% if a == "5%" %} {% with b=a %}\n{# ок #}\n'
+                  '{{ b }}\n{% include "x.html" %}\n{% endwith %}'
+                  '{% endif %}\n')
+        self.assertEqual(strip_whitespace(source),
+                         '{% if a == "5%" %} {% with b=a %}{# ок #}'
+                         '{{ b }}\n{% include "x.html" %}\n'
+                         '{% endwith %}{% endif %}')
+
+    def test_significant_whitespace_kept(self):
+        """Шаблоны с <pre> и <textarea> не меняются."""
+        for source in ('<pre>\n  код\n</pre>\n',
+                       '<textarea>\n  текст\n</textarea>\n'):
+            with self.subTest(source=source):
+                self.assertEqual(strip_whitespace(source), source)
+
+    def test_page_stripped(self):
+        """Страницы отдаются без отступов шаблонов."""
+        content = self.client.get('/about/author/').content.decode()
+        self.assertNotIn('\n    ', content)
@@ -0,0 +1,148 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from django.contrib.auth import get_user_model
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+
+User = get_user_model()
+INDEX_URL = reverse('posts:index')
+METRICS_URL = reverse('core:metrics')
+TOKEN = 'secret-token'
+
+
+class TempMetricsDirMixin:
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.override = override_settings(METRICS_DIR=self.directory,
+                                          METRICS_TOKEN=TOKEN)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        super().tearDown()
+
+
+class RegistryTests(TempMetricsDirMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.registry = metrics.Registry()
+        self.counter = metrics.Counter('test_total', 'Тест', self.registry)
+        self.histogram = metrics.Histogram('test_seconds', 'Тест',
+                                           self.registry, buckets=(1, 2))
+
+    def write(self, name, snapshot):
+        with open(os.path.join(self.directory, name), 'w') as file:
+            json.dump(snapshot, file)
+
+    def test_exposition(self):
+        """Счётчики и гистограммы отдаются в формате Prometheus."""
+        self.counter.inc(view='a')
+        self.counter.inc(2, view='a')
+        self.histogram.observe(0.5)
+        self.histogram.observe(3)
+        text = self.registry.expose()
+        self.assertIn('# TYPE test_total counter', text)
+        self.assertIn('test_total{view="a"} 3', text)
+        self.assertIn('test_seconds_bucket{le="1"} 1', text)
+        self.assertIn('test_seconds_bucket{le="2"} 1', text)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn('test_seconds_sum 3.5', text)
+        self.assertIn('test_seconds_count 2', text)
+
+    def test_processes_aggregated(self):
+        """Значения из файлов других процессов складываются."""
+        self.counter.inc(view='a')
+        self.write(f'1-{metrics.start_time(1)}.json',
+                   {'test_total': [[{'view': 'a'}, 4]],
+                    'test_seconds': [[{}, [1, 0, 0, 0.5]]]})
+        text = self.registry.expose()
+        self.assertIn('test_total{view="a"} 5', text)
+        self.assertIn('test_seconds_count 1', text)
+
+    def test_finished_processes_retired(self):
+        """Файлы завершившихся процессов, в том числе с тем же pid,
+        переносятся в общий файл, и сумма не убывает."""
+        self.counter.inc(view='a')
+        stale = ['999999999-1.json', f'{os.getpid()}-1.json']
+        for name in stale:
+            self.write(name, {'test_total': [[{'view': 'a'}, 2]]})
+        for _ in range(2):
+            self.assertIn('test_total{view="a"} 5', self.registry.expose())
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         ['.lock', metrics.RETIRED])
+
+    def test_flush(self):
+        """Процесс сбрасывает свои значения в собственный файл."""
+        self.counter.inc(view='a')
+        self.registry.flush()
+        name = self.registry.filename
+        self.assertTrue(name.startswith(f'{os.getpid()}-'))
+        with open(os.path.join(self.directory, name)) as file:
+            self.assertEqual(json.load(file)['test_total'],
+                             [[{'view': 'a'}, 1]])
+
+    def test_concurrent_flushes(self):
+        """Параллельные сбросы не падают и оставляют итоговые значения."""
+        errors = []
+
+        def work():
+            try:
+                for _ in range(200):
+                    self.counter.inc(view='a')
+            except Exception as error:
+                errors.append(error)
+
+        with override_settings(METRICS_FLUSH_INTERVAL=0):
+            threads = [threading.Thread(target=work) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
+        self.registry.flush()
+        self.assertEqual(os.listdir(self.directory), [self.registry.filename])
+        with open(os.path.join(self.directory,
+                               self.registry.filename)) as file:
+            self.assertEqual(json.load(file)['test_total'],
+                             [[{'view': 'a'}, 1600]])
+
+
+class MetricsEndpointTests(TempMetricsDirMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+
+    def test_access(self):
+        """Метрики видны сотрудникам и по токену, остальным — нет."""
+        self.assertEqual(Client().get(METRICS_URL).status_code, 403)
+        self.assertEqual(Client().get(
+            METRICS_URL, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(Client().get(
+            METRICS_URL, HTTP_AUTHORIZATION=f'Bearer {TOKEN}').status_code,
+            200)
+        client = Client()
+        client.force_login(self.staff)
+        self.assertEqual(client.get(METRICS_URL).status_code, 200)
+
+    def test_views_templates_and_cache_measured(self):
+        """Просмотр страницы отражается в метриках ответов, шаблонов и
+        кэша."""
+        Client().get(INDEX_URL)
+        text = Client().get(
+            METRICS_URL, HTTP_AUTHORIZATION=f'Bearer {TOKEN}').content.decode()
+        self.assertIn('yatube_requests_total{method="GET",status="200",'
+                      'view="posts:index"}', text)
+        self.assertIn('yatube_request_duration_seconds_count'
+                      '{view="posts:index"}', text)
+        self.assertIn('yatube_template_render_seconds_count'
+                      '{template="index.html"}', text)
+        self.assertIn('yatube_cache_requests_total{result="hit"}', text)
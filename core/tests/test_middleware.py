@@ -0,0 +1,64 @@
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.middleware import QueryBudgetMiddleware
+from core.queries import QueryBudgetExceeded, QueryLog, query_budget, shape
+
+
+def run_queries(count):
+    with connection.cursor() as cursor:
+        for i in range(count):
+            cursor.execute('SELECT %s', [i])
+    return HttpResponse()
+
+
+@query_budget(2)
+def budgeted_view(request):
+    return run_queries(3)
+
+
+class QueryBudgetMiddlewareTests(SimpleTestCase):
+    databases = {'default'}
+
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+
+    def call(self, view):
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+        middleware = QueryBudgetMiddleware(get_response)
+        return middleware(self.request)
+
+    def test_server_timing(self):
+        """Число запросов и время БД попадают в Server-Timing."""
+        response = self.call(lambda request: run_queries(2))
+        self.assertRegex(response['Server-Timing'],
+                         r'^db;dur=[\d.]+;desc="2 queries"$')
+
+    def test_repeated_shapes_logged(self):
+        """Повторяющиеся формы запросов пишутся в лог как N+1."""
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            self.call(lambda request: run_queries(5))
+        self.assertIn('N+1', logs.output[0])
+
+    def test_budget_logged(self):
+        """Превышение бюджета по умолчанию только пишется в лог."""
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            self.call(budgeted_view)
+        self.assertIn('бюджете 2', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_RAISE=True)
+    def test_budget_raises(self):
+        """С QUERY_BUDGET_RAISE превышение бюджета — исключение."""
+        with self.assertRaises(QueryBudgetExceeded):
+            self.call(budgeted_view)
+
+    def test_in_lists_share_shape(self):
+        """Списки IN разной длины дают одну форму запроса."""
+        log = QueryLog()
+        log.shapes[shape('SELECT 1 WHERE id IN (%s, %s)')] += 1
+        log.shapes[shape('SELECT 1 WHERE id IN (%s)')] += 1
+        self.assertEqual(log.repeated(2),
+                         [('SELECT 1 WHERE id IN (...)', 2)])
@@ -0,0 +1,116 @@
+import os
+import shutil
+import tempfile
+import threading
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core import profiling
+
+User = get_user_model()
+INDEX_URL = reverse('posts:index')
+PROFILES_URL = reverse('core:profiles')
+
+
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+        cls.user = User.objects.create(username='user')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.override = override_settings(PROFILE_DIR=self.directory,
+                                          PROFILE_KEEP=2)
+        self.override.enable()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_staff_request_profiled(self):
+        """Запрос сотрудника с флагом сохраняет профиль и сводки."""
+        response = self.staff_client.get(INDEX_URL, {'_profile': '1'})
+        name = response['X-Profile-Id']
+        for extension in profiling.EXTENSIONS:
+            with self.subTest(extension=extension):
+                self.assertTrue(os.path.isfile(
+                    os.path.join(self.directory, name + extension)))
+        response = self.staff_client.get(INDEX_URL, HTTP_X_PROFILE='1')
+        self.assertIn('X-Profile-Id', response)
+
+    def test_others_not_profiled(self):
+        """Без флага и для обычных пользователей профиль не снимается."""
+        self.assertNotIn('X-Profile-Id', self.staff_client.get(INDEX_URL))
+        self.assertNotIn('X-Profile-Id', self.user_client.get(
+            INDEX_URL, {'_profile': '1'}))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_overlapping_runs(self):
+        """Запрос, закончившийся раньше, не останавливает tracemalloc
+        для профилируемого одновременно с ним."""
+        first_in_view, second_in_view = threading.Event(), threading.Event()
+        first_done = threading.Event()
+        results = {}
+
+        def first_view(request):
+            first_in_view.set()
+            second_in_view.wait(5)
+            return HttpResponse()
+
+        def second_view(request):
+            second_in_view.set()
+            first_done.wait(5)
+            return HttpResponse()
+
+        def profile(name, view):
+            try:
+                results[name] = profiling.run(
+                    RequestFactory().get(f'/{name}/'), view)
+            except Exception as error:
+                results[name] = error
+
+        first = threading.Thread(target=profile, args=('first', first_view))
+        second = threading.Thread(target=profile,
+                                  args=('second', second_view))
+        first.start()
+        first_in_view.wait(5)
+        second.start()
+        first.join()
+        first_done.set()
+        second.join()
+        for name, result in results.items():
+            with self.subTest(name=name):
+                self.assertIsInstance(result, HttpResponse)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_old_profiles_pruned(self):
+        """Хранятся файлы только PROFILE_KEEP последних запросов."""
+        for _ in range(3):
+            self.staff_client.get(INDEX_URL, {'_profile': '1'})
+        self.assertEqual(len(os.listdir(self.directory)),
+                         2 * len(profiling.EXTENSIONS))
+
+    def test_listing(self):
+        """Список профилей доступен только сотрудникам."""
+        name = self.staff_client.get(
+            INDEX_URL, {'_profile': '1'})['X-Profile-Id']
+        response = self.staff_client.get(PROFILES_URL)
+        self.assertContains(response, f'{name}.prof')
+        self.assertEqual(self.user_client.get(PROFILES_URL).status_code, 302)
+        summary = self.staff_client.get(
+            reverse('core:profile_file', args=[f'{name}.txt']))
+        self.assertEqual(summary.status_code, 200)
+        self.assertEqual(self.staff_client.get(
+            reverse('core:profile_file', args=['..secret.txt'])).status_code,
+            404)
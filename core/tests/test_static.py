@@ -0,0 +1,100 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from core.staticfiles import CompressedManifestStaticFilesStorage
+
+CSS = b'body { color: red; }\n' * 200
+
+
+class StaticFilesTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.override = override_settings(STATIC_ROOT=self.root,
+                                          STATIC_SENDFILE=None)
+        self.override.enable()
+        self.storage = CompressedManifestStaticFilesStorage()
+        self.write('css/site.css', CSS)
+        self.write('photo.jpg', os.urandom(1024))
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as output:
+            output.write(content)
+
+    def collect(self):
+        paths = {name: (self.storage, name)
+                 for name in ('css/site.css', 'photo.jpg')}
+        list(self.storage.post_process(paths))
+        # Манифест читается при создании хранилища.
+        self.storage = CompressedManifestStaticFilesStorage()
+        return self.storage.stored_name('css/site.css')
+
+    def test_post_process_hashes_and_compresses(self):
+        """collectstatic пишет имена с хешем и .gz для текстовых файлов."""
+        hashed = self.collect()
+        self.assertRegex(hashed, r'^css/site\.[0-9a-f]{12}\.css$')
+        with open(os.path.join(self.root, f'{hashed}.gz'), 'rb') as source:
+            self.assertEqual(gzip.decompress(source.read()), CSS)
+        self.assertFalse(os.path.exists(
+            os.path.join(self.root, 'photo.jpg.gz')))
+
+    def test_missing_files_keep_plain_names(self):
+        """Без манифеста и без файла ссылка ведёт на исходное имя."""
+        self.assertEqual(self.storage.url('missing.css'),
+                         '/static/missing.css')
+
+    def test_serves_gzip_with_immutable_caching(self):
+        """Имя с хешем отдаётся сжатым и кэшируется навсегда."""
+        hashed = self.collect()
+        response = self.client.get(f'/static/{hashed}',
+                                   HTTP_ACCEPT_ENCODING='br, gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)), CSS)
+
+        response = self.client.get(f'/static/{hashed}',
+                                   HTTP_ACCEPT_ENCODING='gzip;q=0, *')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), CSS)
+
+    def test_conditional_request(self):
+        """Повторный запрос с ETag получает 304 без тела."""
+        response = self.client.get('/static/css/site.css')
+        self.assertNotIn('immutable', response['Cache-Control'])
+        response = self.client.get('/static/css/site.css',
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_outside_root_is_not_found(self):
+        """Путь за пределами STATIC_ROOT не отдаётся."""
+        response = self.client.get('/static/../yatube/settings.py')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get('/static/none.css')
+        self.assertEqual(response.status_code, 404)
+
+    def test_sendfile(self):
+        """С STATIC_SENDFILE файл отдаёт фронтенд по заголовку."""
+        hashed = self.collect()
+        with self.settings(STATIC_SENDFILE='X-Accel-Redirect'):
+            response = self.client.get(f'/static/{hashed}',
+                                       HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['X-Accel-Redirect'],
+                         f'/_static/{hashed}.gz')
+        self.assertEqual(response.content, b'')
+        with self.settings(STATIC_SENDFILE='X-Sendfile'):
+            response = self.client.get(f'/static/{hashed}')
+        self.assertEqual(response['X-Sendfile'],
+                         os.path.join(self.root, hashed))
@@ -0,0 +1,47 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from core.storage import ContentAddressedStorage, content_hash
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def tearDown(self):
+        shutil.rmtree(self.location, ignore_errors=True)
+
+    def test_name_follows_content(self):
+        """Имя файла — хеш содержимого в каталоге upload_to."""
+        digest = content_hash(ContentFile(b'image'))
+        name = self.storage.save('posts/photo.JPG', ContentFile(b'image'))
+        self.assertEqual(name,
+                         f'posts/{digest[:2]}/{digest[2:4]}/{digest}.jpg')
+        with self.storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'image')
+
+    def test_same_content_is_written_once(self):
+        """Повторная загрузка того же содержимого не пишет файл."""
+        first = self.storage.save('posts/a.gif', ContentFile(b'same'))
+        with mock.patch.object(self.storage, '_save') as save:
+            second = self.storage.save('posts/b.gif', ContentFile(b'same'))
+        save.assert_not_called()
+        self.assertEqual(first, second)
+        other = self.storage.save('posts/a.gif', ContentFile(b'other'))
+        self.assertNotEqual(first, other)
+
+    def test_concurrent_write_keeps_name(self):
+        """Запись поверх уже появившегося файла не даёт имени суффикс
+        и не оставляет временных файлов."""
+        name = self.storage.save('posts/a.gif', ContentFile(b'same'))
+        with mock.patch.object(self.storage, 'exists', return_value=False):
+            again = self.storage.save('posts/a.gif', ContentFile(b'same'))
+        self.assertEqual(again, name)
+        directory = os.path.dirname(self.storage.path(name))
+        self.assertEqual(os.listdir(directory), [os.path.basename(name)])
@@ -0,0 +1,25 @@
+import time
+
+from sorl.thumbnail.engines.pil_engine import Engine
+
+from . import metrics
+
+
+class TimedEngine(Engine):
+    """PIL-движок sorl-thumbnail, замеряющий обработку и запись миниатюр."""
+
+    def create(self, image, geometry, options):
+        start = time.perf_counter()
+        try:
+            return super().create(image, geometry, options)
+        finally:
+            metrics.thumbnail_seconds.observe(time.perf_counter() - start,
+                                              stage='create')
+
+    def write(self, image, options, thumbnail):
+        start = time.perf_counter()
+        try:
+            return super().write(image, options, thumbnail)
+        finally:
+            metrics.thumbnail_seconds.observe(time.perf_counter() - start,
+                                              stage='write')
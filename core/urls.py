@@ -0,0 +1,18 @@
+import re
+
+from django.conf import settings
+from django.urls import path, re_path
+
+from . import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('admin/profiles/', views.profile_list, name='profiles'),
+    path('admin/profiles/<str:name>', views.profile_file,
+         name='profile_file'),
+    path('metrics/', views.metrics_view, name='metrics'),
+    re_path(r'^{}(?P<path>.+)$'.format(
+        re.escape(settings.STATIC_URL.lstrip('/'))),
+        views.static_file, name='static'),
+]
@@ -0,0 +1,95 @@
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.staticfiles.views import serve as serve_from_finders
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseForbidden)
+from django.shortcuts import render
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date
+
+from . import metrics, profiling, staticfiles
+
+# Имена с хешем не меняют содержимого: их можно кэшировать навсегда.
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+STATIC_CACHE_CONTROL = 'public, max-age=300'
+
+
+@staff_member_required
+def profile_list(request):
+    return render(request, 'core/profiles.html',
+                  {'artifacts': profiling.artifacts()})
+
+
+@staff_member_required
+def profile_file(request, name):
+    path = profiling.path(name)
+    if path is None:
+        raise Http404
+    if name.endswith('.prof'):
+        return FileResponse(open(path, 'rb'), as_attachment=True)
+    return FileResponse(open(path, 'rb'),
+                        content_type='text/plain; charset=utf-8')
+
+
+def metrics_view(request):
+    """Метрики в формате Prometheus: для сотрудников или по токену
+    METRICS_TOKEN в заголовке Authorization: Bearer."""
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    allowed = request.user.is_staff or (
+        token and constant_time_compare(header, f'Bearer {token}'))
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.registry.expose(),
+                        content_type='text/plain; version=0.0.4; '
+                                     'charset=utf-8')
+
+
+def static_file(request, path):
+    """Статика из STATIC_ROOT: .gz-копия, если клиент принимает gzip,
+    годовое кэширование для имён с хешем и условные ответы 304.
+
+    При STATIC_SENDFILE сам файл отдаёт фронтенд по заголовку
+    X-Sendfile или X-Accel-Redirect. Файлы, которых ещё нет в
+    STATIC_ROOT, в режиме DEBUG ищутся по приложениям, как у runserver.
+    """
+    full_path = staticfiles.static_path(path)
+    if full_path is None or not os.path.isfile(full_path):
+        if settings.DEBUG:
+            return serve_from_finders(request, path, insecure=True)
+        raise Http404
+    served, encoding = full_path, None
+    if (staticfiles.gzip_accepted(request)
+            and os.path.isfile(f'{full_path}.gz')):
+        served, encoding = f'{full_path}.gz', 'gzip'
+    stat = os.stat(served)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        content_type = (mimetypes.guess_type(full_path)[0]
+                        or 'application/octet-stream')
+        sendfile = settings.STATIC_SENDFILE
+        if sendfile == 'X-Accel-Redirect':
+            response = HttpResponse(content_type=content_type)
+            response[sendfile] = (settings.STATIC_ACCEL_LOCATION + path
+                                  + ('.gz' if encoding else ''))
+        elif sendfile:
+            response = HttpResponse(content_type=content_type)
+            response[sendfile] = served
+        else:
+            response = FileResponse(open(served, 'rb'),
+                                    content_type=content_type)
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(stat.st_mtime)
+    response['ETag'] = etag
+    response['Cache-Control'] = (IMMUTABLE_CACHE_CONTROL
+                                 if staticfiles.is_hashed(path)
+                                 else STATIC_CACHE_CONTROL)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
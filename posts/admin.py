@@ -1,12 +1,37 @@
 from django.contrib import admin
+from django.db.models import Q
 
+from core.paginator import EstimatedCountPaginator
+
+from . import search
 from .models import Comment, Follow, Group, Post
 
 
-class PostAdmin(admin.ModelAdmin):
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список большой таблицы: без полного COUNT(*), со связанными
+    объектами одним запросом и с поиском по тексту через
+    полнотекстовый индекс вместо LIKE '%…%'."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        ids = search.matching_ids(self.model, search_term)
+        if ids is None:
+            return super().get_search_results(request, queryset,
+                                              search_term)
+        condition = Q(pk__in=ids)
+        for field in self.search_fields:
+            if field.startswith('='):
+                condition |= Q(**{field[1:]: search_term.strip()})
+        return queryset.filter(condition), False
+
+
+class PostAdmin(LargeTableAdmin):
     list_display = ("pk", "text", "pub_date", "author", "group")
-    search_fields = ("text",)
+    list_select_related = ("author", "group")
+    search_fields = ("text", "=author__username")
     list_filter = ("pub_date",)
+    autocomplete_fields = ("author", "group")
     empty_value_display = "-пусто-"
 
 
@@ -18,16 +43,21 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = "-пусто-"
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = ("pk", "created", "text", "author")
-    search_fields = ("text", "author")
+    list_select_related = ("author",)
+    search_fields = ("text", "=author__username")
     list_filter = ("created",)
+    autocomplete_fields = ("author",)
+    raw_id_fields = ("post",)
     empty_value_display = "-пусто-"
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     list_display = ("pk", "user", "author")
-    search_fields = ("author",)
+    list_select_related = ("user", "author")
+    search_fields = ("=author__username", "=user__username")
+    autocomplete_fields = ("user", "author")
     empty_value_display = "-пусто-"
 
 
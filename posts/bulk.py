@@ -0,0 +1,54 @@
+"""Общее для массовой загрузки: import_posts и seed_posts пишут через
+bulk_create, который не отправляет сигналов и не даёт задать даты."""
+from collections import defaultdict
+from contextlib import contextmanager
+
+from . import feed_cache, media, search, stats, timeline
+from .models import Comment, Follow, Post
+
+BATCH_SIZE = 1000
+
+
+@contextmanager
+def preserved_dates():
+    """Сохраняет заданные даты: auto_now и auto_now_add иначе
+    перезаписали бы их временем загрузки прямо в bulk_create."""
+    fields = [Post._meta.get_field('pub_date'),
+              Comment._meta.get_field('created')]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def chunks(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def finish(authors, edges, group_ids, batch_size=BATCH_SIZE):
+    """Делает то, что при обычной записи делают сигналы.
+
+    authors — авторы загруженных постов, edges — загруженные подписки
+    (user_id, author_id). Возвращает число исправленных счётчиков.
+    """
+    fixed = stats.reconcile()
+    media.reconcile()
+    search.rebuild()
+    edges = set(edges)
+    for author_ids in chunks(sorted(authors), batch_size):
+        edges.update(Follow.objects.filter(author_id__in=author_ids)
+                     .values_list('user_id', 'author_id'))
+    followers = defaultdict(list)
+    for user_id, author_id in edges:
+        followers[author_id].append(user_id)
+    for author_id, user_ids in followers.items():
+        timeline.backfill_many(author_id, user_ids)
+    authors = set(authors) | {author_id for _, author_id in edges}
+    feed_cache.bump('all', *(f'author:{pk}' for pk in authors),
+                    *(f'group:{pk}' for pk in group_ids))
+    return fixed
@@ -0,0 +1,128 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from core import compression
+
+KEY_PREFIX = 'feed-generation'
+CHANGED_PREFIX = 'feed-changed'
+
+
+def scope_key(scope):
+    return f'{KEY_PREFIX}:{scope}'
+
+
+def changed_key(scope):
+    return f'{CHANGED_PREFIX}:{scope}'
+
+
+def state(*scopes):
+    """Поколения областей ленты и время их последнего изменения.
+
+    Всё читается одним обращением к кэшу. Пропавшее из кэша поколение
+    заводится заново от текущего времени в миллисекундах, чтобы не
+    совпасть с поколениями старых страниц; временем изменения такой
+    области считается текущий момент.
+    """
+    keys = [scope_key(scope) for scope in scopes]
+    stamps = [changed_key(scope) for scope in scopes]
+    found = cache.get_many(keys + stamps)
+    now = time.time()
+    for key, stamp in zip(keys, stamps):
+        if key not in found:
+            cache.add(key, int(now * 1000), None)
+            found[key] = cache.get(key)
+        if stamp not in found:
+            cache.add(stamp, now, None)
+            found[stamp] = now
+    return ([found[key] for key in keys],
+            max(found[stamp] for stamp in stamps))
+
+
+def generations(*scopes):
+    return state(*scopes)[0]
+
+
+def bump(*scopes):
+    """Переводит области ленты на новое поколение, когда текущая
+    транзакция зафиксирована. Страница, отрисованная до фиксации,
+    содержит старые данные и не должна попасть в кэш под новым
+    поколением."""
+    transaction.on_commit(lambda: _bump(scopes))
+
+
+def _bump(scopes):
+    now = time.time()
+    for scope in set(scopes):
+        try:
+            cache.incr(scope_key(scope))
+        except ValueError:
+            cache.add(scope_key(scope), int(now * 1000), None)
+    cache.set_many({changed_key(scope): now for scope in scopes}, None)
+
+
+def post_scopes(author_id, group_id):
+    scopes = ['all', f'author:{author_id}']
+    if group_id:
+        scopes.append(f'group:{group_id}')
+    return scopes
+
+
+def page_key(request, generations):
+    """Ключ страницы ленты: поколения областей, пользователь (кнопки
+    редактирования своих постов) и параметры страницы."""
+    key = ':'.join(str(generation) for generation in generations)
+    return f'{key}:{request.user.pk or 0}:{request.GET.urlencode()}'
+
+
+def context(request, *scopes):
+    """Ключ и время жизни фрагмента ленты для тега {% cache %}."""
+    return {
+        'feed_cache_key': page_key(request, generations(*scopes)),
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
+
+
+def conditional(scopes_func):
+    """Отвечает 304 Not Modified, не вызывая view, пока не сменились
+    поколения областей страницы; сжатое тело страницы с тем же ETag
+    отдаётся из кэша тоже без вызова view.
+
+    scopes_func(request, *args, **kwargs) возвращает пару (области,
+    дополнительная часть ETag) или None, если условный ответ невозможен.
+    """
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            found = scopes_func(request, *args, **kwargs)
+            if found is None:
+                return view(request, *args, **kwargs)
+            scopes, extra = found
+            generations, changed = state(*scopes)
+            key = f'{page_key(request, generations)}:{extra}'
+            etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+            last_modified = int(changed)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = (compression.cached_response(request, etag)
+                            or view(request, *args, **kwargs))
+                if response.status_code == 200:
+                    response.setdefault('ETag', etag)
+                    # Last-Modified точен до секунды: изменение в ту же
+                    # секунду после ответа не сдвинуло бы его, и клиент с
+                    # одним If-Modified-Since получил бы устаревший 304.
+                    # Поэтому он отдаётся, только когда секунда прошла.
+                    if last_modified < int(time.time()):
+                        response['Last-Modified'] = http_date(last_modified)
+            return response
+        return inner
+    return decorator
@@ -0,0 +1,86 @@
+"""Обработка загружаемых картинок постов.
+
+Картинка поворачивается по EXIF, уменьшается до MAX_SIZE по большей
+стороне и пережимается без метаданных (EXIF с GPS, комментарии);
+цветовой профиль остаётся, иначе поплывут цвета. Рядом готовится
+вариант в WebP, если он меньше. Анимированные GIF не трогаются:
+пересохранение потеряло бы кадры.
+"""
+import io
+import os
+from collections import namedtuple
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+MAX_SIZE = 2048
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+# Параметры сохранения по формату; прочие форматы (BMP, TIFF…)
+# сохраняются в PNG без потерь.
+FORMATS = {
+    'JPEG': ('jpg', {'quality': JPEG_QUALITY, 'optimize': True,
+                     'progressive': True}),
+    'PNG': ('png', {'optimize': True}),
+    'GIF': ('gif', {'optimize': True}),
+    'WEBP': ('webp', {'quality': WEBP_QUALITY, 'method': 6}),
+}
+DEFAULT_FORMAT = 'PNG'
+
+Processed = namedtuple('Processed', 'image webp width height')
+
+
+def _encode(image, format, **options):
+    output = io.BytesIO()
+    image.save(output, format, **options)
+    return output.getvalue()
+
+
+def _mode_for(image, format):
+    has_alpha = (image.mode in ('RGBA', 'LA', 'PA')
+                 or 'transparency' in image.info)
+    if format == 'JPEG':
+        return 'RGB' if image.mode not in ('RGB', 'L') else image.mode
+    if (format in ('WEBP', 'PNG')
+            and image.mode not in ('RGB', 'RGBA', 'L', 'LA')):
+        return 'RGBA' if has_alpha else 'RGB'
+    return image.mode
+
+
+def webp_name(name):
+    return f'{os.path.splitext(name)[0]}.webp'
+
+
+def process(upload):
+    """Готовит загруженный файл к сохранению; возвращает Processed с
+    файлом картинки, вариантом в WebP (или None) и размерами."""
+    upload.seek(0)
+    source = Image.open(upload)
+    if getattr(source, 'is_animated', False):
+        upload.seek(0)
+        return Processed(upload, None, *source.size)
+    format = source.format if source.format in FORMATS else DEFAULT_FORMAT
+    extension, options = FORMATS[format]
+    # JPEG декодируется сразу в уменьшенном масштабе: так огромные
+    # снимки с телефона не разворачиваются в память целиком.
+    source.draft('RGB', (MAX_SIZE, MAX_SIZE))
+    icc_profile = source.info.get('icc_profile')
+    image = ImageOps.exif_transpose(source)
+    image.thumbnail((MAX_SIZE, MAX_SIZE), Image.LANCZOS)
+    if icc_profile and format != 'GIF':
+        options = {**options, 'icc_profile': icc_profile}
+    if format == 'GIF' and 'transparency' in source.info:
+        options = {**options, 'transparency': source.info['transparency']}
+    name = f'{os.path.splitext(os.path.basename(upload.name))[0]}.{extension}'
+    content = _encode(image.convert(_mode_for(image, format)), format,
+                      **options)
+    webp = None
+    if format != 'WEBP':
+        _, webp_options = FORMATS['WEBP']
+        if icc_profile:
+            webp_options = {**webp_options, 'icc_profile': icc_profile}
+        variant = _encode(image.convert(_mode_for(image, 'WEBP')), 'WEBP',
+                          **webp_options)
+        if len(variant) < len(content):
+            webp = ContentFile(variant, name=webp_name(name))
+    return Processed(ContentFile(content, name=name), webp, *image.size)
@@ -0,0 +1,97 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.test import Client
+from django.test.utils import override_settings
+
+from core import compression
+from core.testing import private_cache
+from posts.models import User
+
+from .bench_views import Command as BenchViews
+
+
+def reset_templates():
+    """Сбрасывает кэширующие загрузчики и фрагменты лент, чтобы
+    страницы собрались заново с текущими настройками."""
+    for engine in engines.all():
+        for loader in engine.engine.template_loaders:
+            if hasattr(loader, 'reset'):
+                loader.reset()
+    cache.clear()
+
+
+def cpu_ms(func, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        func()
+    return (time.process_time() - start) * 1000 / repeat
+
+
+class Command(BaseCommand):
+    help = ('Замеряет размер HTML основных страниц до и после очистки '
+            'шаблонов и сжатия, время процессора на сжатие и на ответ '
+            'из кэша сжатых тел')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Сколько раз сжимать каждую страницу')
+        parser.add_argument('--output', help='Куда сохранить результаты')
+
+    def client(self, user_id):
+        client = Client()
+        if user_id:
+            client.force_login(User.objects.get(pk=user_id))
+        return client
+
+    def body(self, url, user_id):
+        response = self.client(user_id).get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: ответ {response.status_code}')
+        return response.content
+
+    def measure(self, url, user_id, requests):
+        with override_settings(TEMPLATE_STRIP_WHITESPACE=False):
+            reset_templates()
+            original = self.body(url, user_id)
+        reset_templates()
+        stripped = self.body(url, user_id)
+        compressed = compression.compress(stripped)
+        compress_ms = cpu_ms(lambda: compression.compress(stripped),
+                             requests)
+        # Весь ответ, сжатое тело которого уже лежит в кэше.
+        client = self.client(user_id)
+        client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        cached_ms = cpu_ms(
+            lambda: client.get(url, HTTP_ACCEPT_ENCODING='gzip'), requests)
+        return {
+            'original_bytes': len(original),
+            'stripped_bytes': len(stripped),
+            'gzip_bytes': len(compressed),
+            'saved_share': round(1 - len(compressed) / len(original), 3),
+            'compress_ms': round(compress_ms, 3),
+            'cached_ms': round(cached_ms, 3),
+        }
+
+    def handle(self, *args, **options):
+        results = {}
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        # Замер очищает кэш, поэтому идёт на временном, а не на общем.
+        with override_settings(ALLOWED_HOSTS=hosts), private_cache():
+            for view, (url, user_id) in BenchViews().targets().items():
+                result = results[view] = self.measure(
+                    url, user_id, options['requests'])
+                self.stdout.write(
+                    f'{view:<14} {result["original_bytes"]:>7} Б → '
+                    f'{result["stripped_bytes"]:>7} Б → '
+                    f'gzip {result["gzip_bytes"]:>6} Б '
+                    f'(−{result["saved_share"]:.0%})  '
+                    f'сжатие {result["compress_ms"]:>6.3f} мс, '
+                    f'ответ из кэша {result["cached_ms"]:>6.3f} мс')
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
@@ -0,0 +1,120 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from core.testing import private_cache
+from posts.models import AuthorStats, Follow, Group, Post, User
+
+TOLERANCE = 0.25
+
+
+def percentile(timings, share):
+    return timings[min(int(len(timings) * share), len(timings) - 1)]
+
+
+class Command(BaseCommand):
+    help = ('Замеряет p50/p95 и число запросов основных страниц и '
+            'сравнивает их с сохранённым эталоном')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кэш перед каждым запросом')
+        parser.add_argument('--output', help='Куда сохранить результаты')
+        parser.add_argument('--baseline', help='Эталон для сравнения')
+        parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                            help='Допустимый рост p95, доля от эталона')
+
+    def targets(self):
+        """Адреса страниц на самых тяжёлых для них данных: самый
+        плодовитый автор, самая большая группа, самый подписанный
+        читатель."""
+        stats = AuthorStats.objects.order_by('-posts_count').first()
+        group = (Group.objects.annotate(size=Count('posts'))
+                 .order_by('-size').first())
+        reader = (Follow.objects.values('user').annotate(size=Count('pk'))
+                  .order_by('-size').first())
+        if stats is None or group is None or reader is None:
+            raise CommandError('Нет данных: сначала запустите seed_posts')
+        author = stats.user
+        post = Post.objects.filter(author=author).first()
+        return {
+            'index': (reverse('posts:index'), None),
+            'group_posts': (reverse('posts:group_posts', args=[group.slug]),
+                            None),
+            'profile': (reverse('posts:profile', args=[author.username]),
+                        None),
+            'post_view': (reverse('posts:post',
+                                  args=[author.username, post.pk]), None),
+            'follow_index': (reverse('posts:follow_index'), reader['user']),
+        }
+
+    def measure(self, url, user_id, requests, warmup, cold):
+        client = Client()
+        if user_id:
+            client.force_login(User.objects.get(pk=user_id))
+        timings, queries = [], []
+        for i in range(warmup + requests):
+            if cold:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = client.get(url)
+                elapsed = (time.perf_counter() - start) * 1000
+            if response.status_code != 200:
+                raise CommandError(f'{url}: ответ {response.status_code}')
+            if i >= warmup:
+                timings.append(elapsed)
+                queries.append(len(captured))
+        timings.sort()
+        return {
+            'p50_ms': round(percentile(timings, 0.5), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'queries': max(queries),
+        }
+
+    def regressions(self, results, baseline, tolerance):
+        found = []
+        for view, result in results.items():
+            expected = baseline.get(view)
+            if expected is None:
+                continue
+            if result['p95_ms'] > expected['p95_ms'] * (1 + tolerance):
+                found.append(f'{view}: p95 {result["p95_ms"]} мс, '
+                             f'эталон {expected["p95_ms"]} мс')
+            if result['queries'] > expected['queries']:
+                found.append(f'{view}: {result["queries"]} запросов, '
+                             f'эталон {expected["queries"]}')
+        return found
+
+    def handle(self, *args, **options):
+        results = {}
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        # Замер очищает кэш, поэтому идёт на временном, а не на общем.
+        with override_settings(ALLOWED_HOSTS=hosts), private_cache():
+            for view, (url, user_id) in self.targets().items():
+                results[view] = self.measure(
+                    url, user_id, options['requests'], options['warmup'],
+                    options['cold'])
+                self.stdout.write(
+                    f'{view:<14} p50 {results[view]["p50_ms"]:>8.2f} мс  '
+                    f'p95 {results[view]["p95_ms"]:>8.2f} мс  '
+                    f'запросов {results[view]["queries"]}')
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                found = self.regressions(results, json.load(baseline),
+                                         options['tolerance'])
+            if found:
+                raise CommandError('Регрессия:\n' + '\n'.join(found))
@@ -0,0 +1,141 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.models import Comment, Follow, Group, Post
+
+CHUNK_SIZE = 2000
+# Модели выгружаются в порядке зависимостей: так import_posts может
+# читать файл одним проходом.
+EXPORTS = {
+    'group': (Group, ('slug', 'title', 'description')),
+    'post': (Post, ('text', 'pub_date', 'author__username', 'group__slug',
+                    'image', 'image_width', 'image_height', 'image_webp')),
+    'comment': (Comment, ('post', 'author__username', 'text', 'created')),
+    'follow': (Follow, ('user__username', 'author__username')),
+}
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает группы, посты, комментарии и подписки '
+            'в NDJSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Файл; по умолчанию stdout')
+        parser.add_argument('--since', help='Не раньше этой даты (ISO 8601)')
+        parser.add_argument('--until', help='Раньше этой даты (ISO 8601)')
+        parser.add_argument('--author', help='Только записи этого автора')
+        parser.add_argument('--group', help='Только записи этой группы')
+        parser.add_argument('--checkpoint',
+                            help='Файл отметок для продолжения выгрузки')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def parse_date(self, value):
+        if value is None:
+            return None
+        date = parse_datetime(value) or parse_datetime(f'{value}T00:00:00')
+        if date is None:
+            raise CommandError(f'Неверная дата: {value}')
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date)
+        return date
+
+    def filters(self, options):
+        """Условия отбора для каждой модели."""
+        since = self.parse_date(options['since'])
+        until = self.parse_date(options['until'])
+        posts, comments, follows = Q(), Q(), Q()
+        groups = Q()
+        if since:
+            posts &= Q(pub_date__gte=since)
+            comments &= Q(post__pub_date__gte=since)
+        if until:
+            posts &= Q(pub_date__lt=until)
+            comments &= Q(post__pub_date__lt=until)
+        if options['author']:
+            posts &= Q(author__username=options['author'])
+            comments &= Q(post__author__username=options['author'])
+            follows &= Q(author__username=options['author'])
+        if options['group']:
+            groups &= Q(slug=options['group'])
+            posts &= Q(group__slug=options['group'])
+            comments &= Q(post__group__slug=options['group'])
+            follows &= Q(pk__in=[])
+        return {'group': groups, 'post': posts, 'comment': comments,
+                'follow': follows}
+
+    def load_checkpoint(self, path):
+        if path and os.path.exists(path):
+            with open(path) as checkpoint:
+                return json.load(checkpoint)
+        return {}
+
+    def save_checkpoint(self, path, state):
+        if not path:
+            return
+        with open(f'{path}.tmp', 'w') as checkpoint:
+            json.dump(state, checkpoint)
+        os.replace(f'{path}.tmp', path)
+
+    def open_output(self, path, state):
+        """Файл выгрузки. При продолжении он обрезается до размера из
+        отметок: строки порции, записанные после последней отметки,
+        выгрузятся повторно и не должны задвоиться."""
+        if not state:
+            return open(path, 'w', encoding='utf-8')
+        if 'offset' in state and os.path.exists(path):
+            os.truncate(path, state['offset'])
+        return open(path, 'a', encoding='utf-8')
+
+    def rows(self, model, fields, condition, last_pk, chunk_size):
+        """Строки модели порциями по первичному ключу.
+
+        Каждая порция — отдельный запрос с pk > последнего выгруженного,
+        поэтому память не зависит от размера таблицы, а выгрузку можно
+        продолжить с любой порции.
+        """
+        queryset = (model.objects.filter(condition).order_by('pk')
+                    .values_list('pk', *fields))
+        while True:
+            chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last_pk = chunk[-1][0]
+
+    def handle(self, *args, **options):
+        filters = self.filters(options)
+        state = self.load_checkpoint(options['checkpoint'])
+        if options['output']:
+            output = self.open_output(options['output'], state)
+        else:
+            output = self.stdout
+        exported = 0
+        try:
+            for name, (model, fields) in EXPORTS.items():
+                names = [field.split('__')[0] for field in fields]
+                for chunk in self.rows(model, fields, filters[name],
+                                       state.get(name, 0),
+                                       options['chunk_size']):
+                    for pk, *values in chunk:
+                        record = {'model': name, 'id': pk,
+                                  **dict(zip(names, values))}
+                        line = json.dumps(record, cls=DjangoJSONEncoder,
+                                          ensure_ascii=False)
+                        output.write(f'{line}\n')
+                    output.flush()
+                    state[name] = chunk[-1][0]
+                    if output is not self.stdout:
+                        os.fsync(output.fileno())
+                        state['offset'] = output.tell()
+                    self.save_checkpoint(options['checkpoint'], state)
+                    exported += len(chunk)
+        finally:
+            if output is not self.stdout:
+                output.close()
+        self.stderr.write(f'Выгружено записей: {exported}')
@@ -0,0 +1,57 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from sorl.thumbnail.images import ImageFile
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def generate(row):
+    image_width, *images = row
+    widths = thumbnails.card_widths(image_width)
+    try:
+        for field, image in zip(thumbnails.FIELDS, images):
+            if image:
+                # Ключ миниатюры sorl зависит от хранилища исходника.
+                storage = Post._meta.get_field(field).storage
+                thumbnails.generate(ImageFile(image, storage), widths,
+                                    **thumbnails.FIELDS[field])
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = ('Создаёт недостающие миниатюры картинок существующих постов, '
+            'например после развёртывания с пустым кэшем')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int,
+            default=max(settings.THUMBNAIL_WORKERS, 1),
+            help='Число потоков')
+
+    def handle(self, *args, **options):
+        images = (Post.objects.exclude(image='').exclude(image=None)
+                  .order_by('pk')
+                  .values_list('image_width', *thumbnails.FIELDS)
+                  .iterator())
+        workers = options['workers']
+        start = time.monotonic()
+        done = 0
+        with ThreadPoolExecutor(workers) as pool:
+            # Картинки отдаются пулу порциями, чтобы не держать в памяти
+            # задания на все посты сразу.
+            while True:
+                batch = list(islice(images,
+                                    workers * thumbnails.QUEUE_PER_WORKER))
+                if not batch:
+                    break
+                done += len(list(pool.map(generate, batch)))
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры {done} картинок за {elapsed:.1f} с'))
@@ -0,0 +1,194 @@
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from posts import bulk
+from posts.models import Comment, Follow, Group, Post, User
+
+# Вторичные индексы, которые можно построить после загрузки.
+DEFERRABLE = (Post, Comment)
+
+
+@contextmanager
+def deferred_indexes(enabled):
+    """Удаляет вторичные индексы на время загрузки и строит их заново."""
+    if not enabled:
+        yield
+        return
+    indexes = [(model, index) for model in DEFERRABLE
+               for index in model._meta.indexes]
+    with connection.schema_editor() as editor:
+        for model, index in indexes:
+            editor.remove_index(model, index)
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.add_index(model, index)
+
+
+class Command(BaseCommand):
+    help = ('Загружает группы, посты, комментарии и подписки из NDJSON '
+            'в формате export_posts')
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Файл NDJSON')
+        parser.add_argument('--batch-size', type=int,
+                            default=bulk.BATCH_SIZE,
+                            help='Строк в одном bulk_create и транзакции')
+        parser.add_argument('--defer-indexes', action='store_true',
+                            help='Строить индексы постов и комментариев '
+                                 'после загрузки')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        # Старый id поста из файла -> новый id в базе.
+        self.posts = {}
+        self.next_post_id = (Post.objects.aggregate(last=Max('pk'))['last']
+                             or 0) + 1
+        self.loaded, self.skipped = Counter(), Counter()
+        self.authors, self.touched_groups, self.edges = set(), set(), set()
+        self.seconds = Counter()
+        started = time.monotonic()
+        with deferred_indexes(options['defer_indexes']):
+            with bulk.preserved_dates():
+                self.load(options['input'])
+        loaded = time.monotonic() - started
+        self.finish()
+        for name, count in self.loaded.items():
+            rate = count / self.seconds[name] if self.seconds[name] else 0
+            self.stdout.write(f'{name}: {count} строк, {rate:.0f} строк/с')
+        for name, count in self.skipped.items():
+            self.stdout.write(f'{name}: пропущено {count} строк')
+        total = sum(self.loaded.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено строк: {total} за {loaded:.1f} с '
+            f'({total / loaded if loaded else 0:.0f} строк/с)'))
+
+    def load(self, path):
+        """Читает файл построчно и копит записи одной модели в пачку.
+
+        export_posts пишет модели в порядке зависимостей, поэтому пачка
+        сбрасывается при смене модели: к приходу комментариев все посты
+        уже в базе и их новые id известны.
+        """
+        model, batch = None, []
+        try:
+            source = open(path, encoding='utf-8')
+        except OSError as error:
+            raise CommandError(error)
+        with source:
+            for number, line in enumerate(source, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    raise CommandError(f'Строка {number}: неверный JSON')
+                full = len(batch) >= self.batch_size
+                if record.get('model') != model or full:
+                    self.flush(model, batch)
+                    model, batch = record.get('model'), []
+                batch.append(record)
+        self.flush(model, batch)
+
+    def flush(self, model, batch):
+        if not batch:
+            return
+        loader = getattr(self, f'load_{model}', None)
+        if loader is None:
+            raise CommandError(f'Неизвестная модель: {model}')
+        started = time.monotonic()
+        with transaction.atomic():
+            self.create_users(batch)
+            loaded = loader(batch)
+        self.seconds[model] += time.monotonic() - started
+        self.loaded[model] += loaded
+        self.skipped[model] += len(batch) - loaded
+
+    def create_users(self, batch):
+        """Заводит авторов, которых ещё нет, с неиспользуемым паролем."""
+        names = {record[field] for record in batch
+                 for field in ('author', 'user') if record.get(field)}
+        missing = names - self.users.keys()
+        if not missing:
+            return
+        password = make_password(None)
+        User.objects.bulk_create(
+            [User(username=name, password=password) for name in missing],
+            batch_size=self.batch_size)
+        self.users.update(User.objects.filter(username__in=missing)
+                          .values_list('username', 'pk'))
+
+    def load_group(self, batch):
+        groups = {record['slug']: record for record in batch
+                  if record['slug'] not in self.groups}
+        Group.objects.bulk_create(
+            [Group(slug=slug, title=record['title'],
+                   description=record['description'])
+             for slug, record in groups.items()],
+            ignore_conflicts=True)
+        self.groups.update(Group.objects.filter(slug__in=groups)
+                           .values_list('slug', 'pk'))
+        return len(groups)
+
+    def load_post(self, batch):
+        # SQLite не возвращает id из bulk_create, поэтому id выдаются
+        # заранее: импорт рассчитан на монопольный доступ к базе.
+        posts = []
+        for record in batch:
+            group = record.get('group')
+            if group and group not in self.groups:
+                continue
+            pub_date = parse_datetime(record['pub_date'])
+            posts.append(Post(
+                pk=self.next_post_id, text=record['text'],
+                pub_date=pub_date,
+                author_id=self.users[record['author']],
+                group_id=self.groups.get(group),
+                image=record.get('image') or None,
+                image_width=record.get('image_width'),
+                image_height=record.get('image_height'),
+                image_webp=record.get('image_webp') or None))
+            self.posts[record['id']] = self.next_post_id
+            self.authors.add(posts[-1].author_id)
+            if posts[-1].group_id:
+                self.touched_groups.add(posts[-1].group_id)
+            self.next_post_id += 1
+        Post.objects.bulk_create(posts)
+        return len(posts)
+
+    def load_comment(self, batch):
+        comments = [
+            Comment(post_id=self.posts[record['post']],
+                    author_id=self.users[record['author']],
+                    text=record['text'],
+                    created=parse_datetime(record['created']))
+            for record in batch if record['post'] in self.posts]
+        Comment.objects.bulk_create(comments)
+        return len(comments)
+
+    def load_follow(self, batch):
+        edges = {(self.users[record['user']], self.users[record['author']])
+                 for record in batch if record['user'] != record['author']}
+        Follow.objects.bulk_create(
+            [Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in edges],
+            ignore_conflicts=True)
+        self.edges |= edges
+        return len(edges)
+
+    def finish(self):
+        fixed = bulk.finish(self.authors, self.edges, self.touched_groups,
+                            self.batch_size)
+        self.stdout.write(f'Исправлено счётчиков: {fixed}')
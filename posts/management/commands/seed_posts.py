@@ -0,0 +1,178 @@
+import bisect
+import datetime as dt
+import itertools
+import random
+import time
+from array import array
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from posts import bulk
+from posts.models import Comment, Follow, Group, Post, User
+
+USERNAME_PREFIX = 'seed'
+WORDS = ('день город утро кот море книга река лес дом дорога ночь снег '
+         'окно поезд чай письмо сад песня ветер мост').split()
+DAYS = 365
+
+
+def zipf_weights(count, alpha):
+    """Накопленные веса степенного распределения: k-й по популярности
+    элемент выбирается в k ** alpha раз реже первого."""
+    return list(itertools.accumulate(
+        1 / (rank ** alpha) for rank in range(1, count + 1)))
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'постами, комментариями и подписками со степенным '
+            'распределением активности')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--comments', type=int, default=500000)
+        parser.add_argument('--follows', type=int, default=100000)
+        parser.add_argument('--alpha', type=float, default=1.1,
+                            help='Показатель степенного распределения')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int,
+                            default=bulk.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['users'] < 2:
+            raise CommandError('Нужно хотя бы два пользователя')
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.alpha = options['alpha']
+        self.now = timezone.now()
+        started = time.monotonic()
+        with bulk.preserved_dates():
+            users = self.create_users(options['users'])
+            groups = self.create_groups(options['groups'])
+            posts, dates = self.create_posts(options['posts'], users, groups)
+            self.create_comments(options['comments'], users, posts, dates)
+            edges = self.create_follows(options['follows'], users)
+        bulk.finish(users, edges, groups, self.batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с'))
+
+    def pick(self, items, weights):
+        """Случайный элемент с учётом накопленных весов."""
+        point = self.random.random() * weights[-1]
+        return items[bisect.bisect(weights, point)]
+
+    def next_ids(self, model, count):
+        start = (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        return list(range(start, start + count))
+
+    def insert(self, model, objects, label):
+        """Пишет объекты пачками, каждая пачка в своей транзакции."""
+        written = 0
+        for chunk in self.batches(objects):
+            with transaction.atomic():
+                model.objects.bulk_create(chunk, ignore_conflicts=True)
+            written += len(chunk)
+        self.stdout.write(f'{label}: {written}')
+
+    def batches(self, objects):
+        iterator = iter(objects)
+        while True:
+            chunk = list(itertools.islice(iterator, self.batch_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def create_users(self, count):
+        ids = self.next_ids(User, count)
+        password = make_password(None)
+        self.insert(User, (
+            User(pk=pk, username=f'{USERNAME_PREFIX}{pk}', password=password)
+            for pk in ids), 'Пользователи')
+        # Популярность авторов случайна и не связана с порядком id.
+        self.random.shuffle(ids)
+        return ids
+
+    def create_groups(self, count):
+        ids = self.next_ids(Group, count)
+        self.insert(Group, (
+            Group(pk=pk, title=f'Группа {pk}',
+                  slug=f'{USERNAME_PREFIX}-{pk}',
+                  description=self.text(10))
+            for pk in ids), 'Группы')
+        return ids
+
+    def text(self, words):
+        return ' '.join(self.random.choice(WORDS) for _ in range(words))
+
+    def date(self):
+        return self.now - dt.timedelta(seconds=self.random.random()
+                                       * DAYS * 24 * 60 * 60)
+
+    def create_posts(self, count, users, groups):
+        """Посты по степенному закону от авторов и групп.
+
+        Возвращает id постов и их даты в секундах от начала эпохи: в
+        array, чтобы миллион постов занимал мегабайты, а не сотни.
+        """
+        ids = self.next_ids(Post, count)
+        dates = array('d')
+        author_weights = zipf_weights(len(users), self.alpha)
+        group_weights = zipf_weights(len(groups), self.alpha)
+
+        def posts():
+            for pk in ids:
+                pub_date = self.date()
+                dates.append(pub_date.timestamp())
+                group = None
+                if groups and self.random.random() < 0.5:
+                    group = self.pick(groups, group_weights)
+                yield Post(pk=pk, text=self.text(self.random.randint(5, 60)),
+                           pub_date=pub_date,
+                           author_id=self.pick(users, author_weights),
+                           group_id=group)
+
+        self.insert(Post, posts(), 'Посты')
+        return ids, dates
+
+    def create_comments(self, count, users, posts, dates):
+        if not posts:
+            return
+        post_weights = zipf_weights(len(posts), self.alpha)
+        order = list(range(len(posts)))
+        self.random.shuffle(order)
+
+        def comments():
+            for _ in range(count):
+                index = self.pick(order, post_weights)
+                posted = dates[index]
+                created = posted + self.random.random() * (
+                    self.now.timestamp() - posted)
+                yield Comment(
+                    post_id=posts[index],
+                    author_id=self.random.choice(users),
+                    text=self.text(self.random.randint(3, 20)),
+                    created=dt.datetime.fromtimestamp(created,
+                                                      dt.timezone.utc))
+
+        self.insert(Comment, comments(), 'Комментарии')
+
+    def create_follows(self, count, users):
+        """Подписки: читатель равновероятен, автор — по степенному закону."""
+        weights = zipf_weights(len(users), self.alpha)
+        edges = set()
+        attempts = 0
+        while len(edges) < count and attempts < count * 10:
+            attempts += 1
+            user_id = self.random.choice(users)
+            author_id = self.pick(users, weights)
+            if user_id != author_id:
+                edges.add((user_id, author_id))
+        self.insert(Follow, (Follow(user_id=user_id, author_id=author_id)
+                             for user_id, author_id in edges), 'Подписки')
+        return edges
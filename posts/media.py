@@ -0,0 +1,125 @@
+"""Счётчики ссылок на картинки в хранилище по содержимому.
+
+Одинаковые картинки разных постов — один файл (core.storage), поэтому
+удалить его вместе с постом нельзя. StoredFile считает посты,
+ссылающиеся на файл; сигналы сдвигают счётчики при сохранении и
+удалении поста, а файл без ссылок удаляется вместе с миниатюрами после
+фиксации транзакции.
+
+Ссылка на новую картинку берётся до записи файла (reserve), а файл
+удаляется под блокировкой строки с повторной проверкой счётчика. Так
+загрузка того же файла одновременно с удалением либо застаёт ссылку и
+файл не удаляется, либо ждёт удаления и записывает файл заново.
+"""
+import logging
+from collections import Counter
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.db.models import Count, F
+from sorl.thumbnail import delete as delete_with_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post, StoredFile
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('image', 'image_webp')
+BATCH_SIZE = 500
+
+
+def names(post):
+    """Имена файлов поста."""
+    return {getattr(post, field).name for field in FIELDS
+            if getattr(post, field)}
+
+
+def pending_names(post):
+    """Имена, под которыми сохранятся ещё не записанные файлы поста."""
+    pending = set()
+    for field_name in FIELDS:
+        file = getattr(post, field_name)
+        if not file or file._committed:
+            continue
+        field = post._meta.get_field(field_name)
+        if hasattr(field.storage, 'hashed_name'):
+            pending.add(field.storage.hashed_name(
+                field.generate_filename(post, file.name), file))
+    return pending
+
+
+def reserve(post):
+    """Берёт ссылки на файлы поста до их записи; возвращает их имена."""
+    old = {getattr(post, f'_old_{field}', None) for field in FIELDS}
+    reserved = pending_names(post) - old
+    acquire(reserved)
+    return reserved
+
+
+def acquire(names):
+    if not names:
+        return
+    with transaction.atomic():
+        StoredFile.objects.bulk_create(
+            [StoredFile(name=name) for name in names], ignore_conflicts=True)
+        StoredFile.objects.filter(name__in=names).update(
+            references=F('references') + 1)
+
+
+def release(names):
+    """Уменьшает счётчики; файлы без ссылок удаляются после фиксации.
+    Файлы без строки счётчика (загруженные до его появления и не
+    сверенные reconcile) не трогаются."""
+    if not names:
+        return
+    StoredFile.objects.filter(name__in=names, references__gt=0).update(
+        references=F('references') - 1)
+    unreferenced = list(StoredFile.objects.filter(name__in=names,
+                                                  references=0)
+                        .values_list('name', flat=True))
+    if unreferenced:
+        transaction.on_commit(lambda: delete_unreferenced(unreferenced))
+
+
+def delete_unreferenced(names):
+    """Удаляет файлы, на которые так и не появилось ссылок. Строка
+    счётчика заблокирована, пока файл удаляется: загрузка того же
+    файла ждёт в acquire и потом записывает его заново."""
+    storage = Post._meta.get_field('image').storage
+    for name in names:
+        with transaction.atomic():
+            unreferenced = (StoredFile.objects.select_for_update()
+                            .filter(name=name, references=0))
+            if not unreferenced.exists():
+                continue
+            unreferenced.delete()
+            try:
+                delete_with_thumbnails(ImageFile(name, storage))
+            except (OSError, SuspiciousFileOperation):
+                logger.exception('Не удалось удалить файл %s', name)
+
+
+def reconcile(batch_size=BATCH_SIZE):
+    """Пересчитывает счётчики по постам, например после загрузки
+    bulk_create, минуя сигналы. Файлы не удаляются. Возвращает число
+    исправленных строк."""
+    actual = Counter()
+    for field in FIELDS:
+        actual.update(dict(
+            Post.objects.exclude(**{field: ''}).exclude(**{field: None})
+            .order_by().values(field).annotate(count=Count('pk'))
+            .values_list(field, 'count')))
+    stored = dict(StoredFile.objects.values_list('name', 'references'))
+    missing = [StoredFile(name=name, references=count)
+               for name, count in actual.items() if name not in stored]
+    drifted = [StoredFile(name=name, references=count)
+               for name, count in actual.items()
+               if name in stored and stored[name] != count]
+    stale = [name for name in stored if name not in actual]
+    with transaction.atomic():
+        StoredFile.objects.bulk_create(missing, batch_size)
+        StoredFile.objects.bulk_update(drifted, ['references'], batch_size)
+        for start in range(0, len(stale), batch_size):
+            StoredFile.objects.filter(
+                name__in=stale[start:start + batch_size]).delete()
+    return len(missing) + len(drifted) + len(stale)
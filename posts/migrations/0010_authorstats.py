@@ -0,0 +1,55 @@
+# Generated by Django 2.2.6 on 2026-10-18 17:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_stats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    # Повторные подписки удаляются только в 0011, поэтому подписки
+    # считаются без повторов.
+    counters = {
+        'posts_count': dict(Post.objects.order_by().values_list(
+            'author').annotate(models.Count('pk'))),
+        'followers_count': dict(Follow.objects.order_by().values_list(
+            'author').annotate(models.Count('user', distinct=True))),
+        'following_count': dict(Follow.objects.order_by().values_list(
+            'user').annotate(models.Count('author', distinct=True))),
+    }
+    AuthorStats.objects.bulk_create(
+        (AuthorStats(user_id=pk, **{
+            counter: counts.get(pk, 0)
+            for counter, counts in counters.items()})
+         for pk in User.objects.values_list('pk', flat=True)),
+        batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0009_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    primary_key=True, related_name='stats',
+                    serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(
+                    default=0, verbose_name='Записей')),
+                ('followers_count', models.PositiveIntegerField(
+                    default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(
+                    default=0, verbose_name='Подписан')),
+            ],
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
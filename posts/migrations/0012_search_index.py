@@ -0,0 +1,37 @@
+from django.db import migrations
+
+CREATE = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5(
+    text, tokenize = 'unicode61 remove_diacritics 2'
+)
+'''
+# rowid записи индекса: id поста * 2 или id комментария * 2 + 1.
+FILL = '''
+INSERT INTO posts_search (rowid, text)
+SELECT id * 2, text FROM posts_post
+UNION ALL
+SELECT id * 2 + 1, text FROM posts_comment
+'''
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE)
+    schema_editor.execute(FILL)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False,
+                                              null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_webp',
+            field=models.ImageField(blank=True, editable=False, null=True,
+                                    upload_to='posts/'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False,
+                                              null=True),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:31
+
+from collections import Counter
+
+import core.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+FIELDS = ('image', 'image_webp')
+
+
+def count_references(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    StoredFile = apps.get_model('posts', 'StoredFile')
+    references = Counter()
+    for field in FIELDS:
+        references.update(dict(
+            Post.objects.exclude(**{field: ''}).exclude(**{field: None})
+            .order_by().values(field).annotate(count=Count('pk'))
+            .values_list(field, 'count')))
+    StoredFile.objects.bulk_create(
+        [StoredFile(name=name, references=count)
+         for name, count in references.items()], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True,
+                                          serialize=False)),
+                ('references', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(
+                blank=True, null=True, upload_to='posts/',
+                storage=core.storage.ContentAddressedStorage()),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image_webp',
+            field=models.ImageField(
+                blank=True, editable=False, null=True, upload_to='posts/',
+                storage=core.storage.ContentAddressedStorage()),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,11 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.storage import ContentAddressedStorage
+
+from . import images
 
 User = get_user_model()
 
@@ -16,6 +22,17 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def with_feed_data(self):
+        """Подтягивает автора, группу и число комментариев одним запросом."""
+        comment_count = (Comment.objects.filter(post=OuterRef('pk'))
+                         .order_by().values('post')
+                         .annotate(count=Count('pk')).values('count'))
+        return self.select_related('author', 'group').annotate(
+            comment_count=Coalesce(
+                Subquery(comment_count, output_field=IntegerField()), 0))
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name='Текст поста',
                             help_text='Здесь напишите текст записи')
@@ -26,14 +43,50 @@ class Post(models.Model):
     group = models.ForeignKey(Group, blank=True, null=True,
                               on_delete=models.SET_NULL,
                               related_name='posts')
-    image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    # Картинки лежат под именами по содержимому: одинаковые загрузки
+    # хранятся один раз, а удаляются по счётчику ссылок (posts.media).
+    image = models.ImageField(upload_to='posts/', blank=True, null=True,
+                              storage=ContentAddressedStorage())
+    # Размеры и вариант в WebP заполняет save (см. posts.images).
+    # width_field/height_field не подходят: для старых записей без
+    # размеров Django открывал бы файл при каждой загрузке поста.
+    image_width = models.PositiveIntegerField(blank=True, null=True,
+                                              editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True,
+                                               editable=False)
+    image_webp = models.ImageField(upload_to='posts/', blank=True,
+                                   null=True, editable=False,
+                                   storage=ContentAddressedStorage())
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        # Картинка пережимается при любом сохранении — из формы, админки
+        # или кода, — а не только в PostForm.
+        if not self.image:
+            self.image_webp = self.image_width = self.image_height = None
+        elif not self.image._committed:
+            processed = images.process(self.image.file)
+            self.image = processed.image
+            self.image_webp = processed.webp
+            self.image_width = processed.width
+            self.image_height = processed.height
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE,
@@ -48,6 +101,10 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(fields=['post', '-created', '-id'],
+                         name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -59,5 +116,58 @@ class Follow(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, unique=False,
                                related_name='following')
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unique_follow'),
+        ]
+
     def __str__(self):
         return f'User:{self.user} following to {self.author}'
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='timeline_entries')
+    pub_date = models.DateTimeField(verbose_name='date published')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_pub_date_idx'),
+        ]
+
+    def __str__(self):
+        return f'Post:{self.post_id} in timeline of {self.user_id}'
+
+
+class AuthorStats(models.Model):
+    """Счётчики автора, поддерживаемые при записи постов и подписок."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name='stats')
+    posts_count = models.PositiveIntegerField(verbose_name='Записей',
+                                              default=0)
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков', default=0)
+    following_count = models.PositiveIntegerField(verbose_name='Подписан',
+                                                  default=0)
+
+    def __str__(self):
+        return f'Stats of {self.user_id}'
+
+
+class StoredFile(models.Model):
+    """Число записей, ссылающихся на файл хранилища по содержимому."""
+    name = models.CharField(max_length=255, primary_key=True)
+    references = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
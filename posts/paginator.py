@@ -0,0 +1,178 @@
+import base64
+import binascii
+from collections.abc import Sequence
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+# Номера страниц больше этого не бывают; без предела OFFSET огромного
+# номера переполняет целое в базе.
+MAX_PAGE_NUMBER = 100000
+MAX_PK = 2 ** 63 - 1
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def page_number(value):
+    return min(max(int(value), 1), MAX_PAGE_NUMBER)
+
+
+def encode_cursor(number, key, pk):
+    """Упаковывает позицию в ленте в непрозрачный токен для URL."""
+    if hasattr(key, 'isoformat'):
+        key = key.isoformat()
+    raw = f'{number}|{key}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, field=None):
+    """Разбирает токен, созданный encode_cursor, в (номер, ключ, pk).
+
+    С полем модели field ключ приводится к его типу, так что
+    подделанный токен даёт InvalidCursor, а не ошибку в запросе.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        number, key, pk = raw.split('|')
+        if field is not None:
+            key = field.to_python(key)
+            if key is None:
+                raise ValueError(token)
+        pk = int(pk)
+        if abs(pk) > MAX_PK:
+            raise ValueError(token)
+        return page_number(number), key, pk
+    except (binascii.Error, UnicodeError, ValueError, ValidationError):
+        raise InvalidCursor(token)
+
+
+class KeysetPaginator:
+    """Постраничный вывод по ключу (key, pk) без COUNT и OFFSET.
+
+    Страницы адресуются токенами ?after= / ?before=, указывающими на
+    последнюю или первую запись соседней страницы. Старые ссылки вида
+    ?page=N обслуживаются через OFFSET, но также без подсчёта записей.
+    tiebreak — поле, равное pk записей страницы, если объекты страницы
+    выбираются не по своей таблице (как в timeline.FollowFeed).
+    """
+
+    def __init__(self, object_list, per_page, key='-pub_date',
+                 tiebreak='pk'):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.descending = key.startswith('-')
+        self.key = key.lstrip('-')
+        self.tiebreak = tiebreak
+        self.field = object_list.model._meta.get_field(self.key)
+
+    def _ordering(self, reverse=False):
+        descending = self.descending != reverse
+        prefix = '-' if descending else ''
+        return f'{prefix}{self.key}', f'{prefix}{self.tiebreak}'
+
+    def _seek(self, key, pk, forward):
+        lookup = 'lt' if self.descending == forward else 'gt'
+        return (Q(**{f'{self.key}__{lookup}': key})
+                | Q(**{self.key: key, f'{self.tiebreak}__{lookup}': pk}))
+
+    def get_page(self, after=None, before=None, number=None):
+        """Возвращает страницу, не обращаясь к базе до первого чтения.
+
+        Некорректные токены и номера дают первую страницу, как это
+        делает Paginator.get_page.
+        """
+        queryset = self.object_list
+        try:
+            if after:
+                number, key, pk = decode_cursor(after, self.field)
+                queryset = queryset.filter(self._seek(key, pk, True))
+                return KeysetPage(queryset.order_by(*self._ordering()),
+                                  self, number, has_previous=True)
+            if before:
+                number, key, pk = decode_cursor(before, self.field)
+                queryset = queryset.filter(self._seek(key, pk, False))
+                return KeysetPage(
+                    queryset.order_by(*self._ordering(reverse=True)),
+                    self, number, has_next=True, reverse=True)
+        except InvalidCursor:
+            pass
+        try:
+            number = page_number(number)
+        except (TypeError, ValueError):
+            number = 1
+        offset = (number - 1) * self.per_page
+        return KeysetPage(queryset.order_by(*self._ordering()), self,
+                          number, has_previous=number > 1, offset=offset)
+
+
+class KeysetPage(Sequence):
+    def __init__(self, queryset, paginator, number, has_previous=None,
+                 has_next=None, reverse=False, offset=0):
+        self.paginator = paginator
+        self.number = number
+        self._queryset = queryset
+        self._has_previous = has_previous
+        self._has_next = has_next
+        self._reverse = reverse
+        self._offset = offset
+
+    def __repr__(self):
+        return f'<Page {self.number}>'
+
+    @cached_property
+    def object_list(self):
+        per_page = self.paginator.per_page
+        start = self._offset
+        rows = list(self._queryset[start:start + per_page + 1])
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if self._reverse:
+            rows.reverse()
+            self._has_previous = has_more
+        else:
+            self._has_next = has_more
+        return rows
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        self.object_list
+        return self._has_next
+
+    def has_previous(self):
+        self.object_list
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return max(self.number - 1, 1)
+
+    def _cursor(self, number, obj):
+        return encode_cursor(number, getattr(obj, self.paginator.key),
+                             obj.pk)
+
+    @property
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return self._cursor(self.next_page_number(), self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous() or not self.object_list:
+            return None
+        return self._cursor(self.previous_page_number(), self.object_list[0])
@@ -0,0 +1,165 @@
+"""Полнотекстовый поиск по постам и комментариям на SQLite FTS5.
+
+Индекс posts_search создаётся миграцией 0013 и поддерживается
+сигналами. Пост и комментарий делят один индекс: rowid записи —
+id поста * 2 или id комментария * 2 + 1. На других СУБД индекса нет,
+и поиск ничего не находит.
+"""
+import re
+from collections import namedtuple
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Comment, Post
+from .paginator import InvalidCursor, decode_cursor, encode_cursor
+
+TABLE = 'posts_search'
+RESULTS_PER_PAGE = 20
+SNIPPET_TOKENS = 16
+# Границы совпадения в сниппете: текст экранируется уже после FTS5,
+# поэтому выделение ставится управляющими символами, а не тегами.
+MARK_START, MARK_END = '\x02', '\x03'
+WORD = re.compile(r'\w+')
+
+Hit = namedtuple('Hit', 'post comment snippet')
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def post_rowid(post_id):
+    return post_id * 2
+
+
+def comment_rowid(comment_id):
+    return comment_id * 2 + 1
+
+
+def _execute(sql, params=()):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def index(rowid, text):
+    if available():
+        _execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [rowid])
+        _execute(f'INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)',
+                 [rowid, text])
+
+
+def unindex(rowid):
+    if available():
+        _execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [rowid])
+
+
+def rebuild():
+    """Перестраивает индекс по текущим постам и комментариям."""
+    if not available():
+        return
+    _execute(f'DELETE FROM {TABLE}')
+    _execute(
+        f'INSERT INTO {TABLE} (rowid, text) '
+        f'SELECT id * 2, text FROM {Post._meta.db_table} UNION ALL '
+        f'SELECT id * 2 + 1, text FROM {Comment._meta.db_table}')
+    _execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+
+
+def match_query(text):
+    """Запрос FTS5 из пользовательского ввода: все слова, каждое в
+    кавычках, чтобы операторы FTS5 во вводе не разбирались."""
+    words = WORD.findall(text.lower())
+    return ' '.join(f'"{word}"' for word in words)
+
+
+def matching_ids(model, text):
+    """Подзапрос id постов (model=Post) или комментариев, подходящих
+    под запрос; None, если искать нечего или индекса нет."""
+    remainders = {Post: 0, Comment: 1}
+    query = match_query(text)
+    if model not in remainders or not query or not available():
+        return None
+    remainder = remainders[model]
+    return RawSQL(f'SELECT rowid / 2 FROM {TABLE} WHERE {TABLE} MATCH %s '
+                  f'AND rowid %% 2 = {remainder}', [query])
+
+
+def highlight(snippet):
+    return mark_safe(escape(snippet).replace(MARK_START, '<mark>')
+                     .replace(MARK_END, '</mark>'))
+
+
+class SearchPage:
+    """Страница результатов, упорядоченных по bm25, с курсором на
+    следующую страницу."""
+
+    def __init__(self, hits, next_cursor):
+        self.object_list = hits
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def search(text, group_id=None, author_id=None, after=None,
+           per_page=RESULTS_PER_PAGE):
+    """Ищет посты и комментарии; фильтры группы и автора относятся к
+    посту, а автор комментария — к самому комментарию."""
+    query = match_query(text)
+    if not query or not available():
+        return SearchPage([], None)
+    post_table, comment_table = (Post._meta.db_table,
+                                 Comment._meta.db_table)
+    rowid, rank = f'{TABLE}.rowid', f'bm25({TABLE})'
+    conditions, params = [f'{TABLE} MATCH %s'], [query]
+    if group_id is not None:
+        conditions.append('p.group_id = %s')
+        params.append(group_id)
+    if author_id is not None:
+        conditions.append('COALESCE(c.author_id, p.author_id) = %s')
+        params.append(author_id)
+    if after:
+        try:
+            _, last_rank, last_rowid = decode_cursor(after)
+            last_rank = float(last_rank)
+        except (InvalidCursor, ValueError):
+            pass
+        else:
+            conditions.append(
+                f'({rank} > %s OR ({rank} = %s AND {rowid} > %s))')
+            params += [last_rank, last_rank, last_rowid]
+    rows = _execute(
+        f'SELECT {rowid}, {rank}, p.id, c.id, '
+        f"snippet({TABLE}, 0, '{MARK_START}', '{MARK_END}', '…', "
+        f'{SNIPPET_TOKENS}) '
+        f'FROM {TABLE} '
+        f'LEFT JOIN {comment_table} c '
+        f'ON {rowid} %% 2 = 1 AND c.id = {rowid} / 2 '
+        f'JOIN {post_table} p ON p.id = CASE WHEN {rowid} %% 2 = 0 '
+        f'THEN {rowid} / 2 ELSE c.post_id END '
+        f'WHERE {" AND ".join(conditions)} '
+        f'ORDER BY {rank}, {rowid} LIMIT %s',
+        params + [per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last_rowid, last_rank = rows[-1][:2]
+        next_cursor = encode_cursor(1, repr(last_rank), last_rowid)
+    posts = (Post.objects.select_related('author', 'group')
+             .in_bulk([row[2] for row in rows]))
+    comments = (Comment.objects.select_related('author')
+                .in_bulk([row[3] for row in rows if row[3]]))
+    hits = [Hit(posts[post_id], comments.get(comment_id),
+                highlight(snippet))
+            for _, _, post_id, comment_id, snippet in rows]
+    return SearchPage(hits, next_cursor)
@@ -0,0 +1,157 @@
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import feed_cache, media, search, stats, thumbnails, timeline
+from .models import Comment, Follow, Group, Post
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.change(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    stats.change(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline(sender, instance, **kwargs):
+    timeline.trim(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.change(instance.author_id, 'followers_count', 1)
+        stats.change(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    stats.change(instance.author_id, 'followers_count', -1)
+    stats.change(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_delete, sender=Follow)
+def refill_timelines(sender, instance, **kwargs):
+    timeline.refill_if_demoted(instance.author_id)
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_values(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        (instance._old_group_id, instance._old_image,
+         instance._old_image_webp) = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', 'image', 'image_webp').first()
+            or (None, None, None))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    scopes = feed_cache.post_scopes(instance.author_id, instance.group_id)
+    scopes.append(f'post:{instance.pk}')
+    old_group_id = getattr(instance, '_old_group_id', None)
+    if old_group_id:
+        scopes.append(f'group:{old_group_id}')
+    feed_cache.bump(*scopes)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group_feeds(sender, instance, raw=False, **kwargs):
+    """Название группы выводится в карточках её постов во всех лентах."""
+    if raw:
+        return
+    posts = Post.objects.filter(group=instance).order_by()
+    feed_cache.bump(
+        'all', f'group:{instance.pk}',
+        *(f'author:{author_id}' for author_id in
+          posts.values_list('author_id', flat=True).distinct()),
+        *(f'post:{pk}' for pk in posts.values_list('pk', flat=True)))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_feeds(sender, instance, **kwargs):
+    post = (Post.objects.filter(pk=instance.post_id)
+            .values_list('author_id', 'group_id').first())
+    if post:
+        feed_cache.bump(*feed_cache.post_scopes(*post),
+                        f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feed(sender, instance, **kwargs):
+    feed_cache.bump(f'follow:{instance.user_id}')
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index(search.post_rowid(instance.pk), instance.text)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex(search.post_rowid(instance.pk))
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index(search.comment_rowid(instance.pk), instance.text)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    search.unindex(search.comment_rowid(instance.pk))
+
+
+@receiver(post_save, sender=Post)
+def pregenerate_thumbnails(sender, instance, raw=False, **kwargs):
+    image = instance.image
+    old_image = getattr(instance, '_old_image', None)
+    if raw or not image or image.name == old_image:
+        return
+    transaction.on_commit(lambda: thumbnails.schedule_post(instance))
+
+
+@receiver(pre_save, sender=Post)
+def reserve_file_references(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._reserved_files = media.reserve(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_file_references(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = {getattr(instance, f'_old_{field}', None)
+           for field in media.FIELDS} - {None, ''}
+    new = media.names(instance)
+    media.acquire(new - old - instance._reserved_files)
+    media.release(old - new)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_file_references(sender, instance, **kwargs):
+    media.release(media.names(instance))
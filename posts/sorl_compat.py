@@ -0,0 +1,41 @@
+"""Закрытые детали sorl-thumbnail, на которые опирается card_images.
+
+Написано под sorl-thumbnail 12.6.3; при обновлении sorl этот модуль
+сверяется с его исходниками:
+
+* thumbnail_file повторяет вычисление имени миниатюры из
+  ThumbnailBackend.get_thumbnail (_get_format, extra_options,
+  _get_thumbnail_filename);
+* kvstore_cache — кэш хранилища ключей cached_db (KVStore.cache),
+  EMPTY_VALUE — то, что оно кладёт в кэш для отсутствующих ключей.
+"""
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+
+__all__ = ['EMPTY_VALUE', 'kvstore_cache', 'thumbnail_file']
+
+
+def thumbnail_file(image, geometry, **options):
+    """Ещё не прочитанная миниатюра с тем именем, которое дал бы ей
+    get_thumbnail, без обращения к хранилищу ключей."""
+    backend = default.backend
+    source = ImageFile(image)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    return ImageFile(
+        backend._get_thumbnail_filename(source, geometry, options),
+        default.storage)
+
+
+def kvstore_cache():
+    """Кэш Django перед таблицей хранилища ключей cached_db."""
+    return default.kvstore.cache
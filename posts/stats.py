@@ -0,0 +1,98 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Follow, Post, User
+
+BATCH_SIZE = 500
+COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def counted(queryset):
+    """Аннотирует пользователей фактическими значениями счётчиков."""
+    annotations = {}
+    for counter, (model, field) in COUNTERS.items():
+        rows = (model.objects.filter(**{field: OuterRef('pk')})
+                .order_by().values(field)
+                .annotate(count=Count('pk')).values('count'))
+        annotations[f'actual_{counter}'] = Coalesce(
+            Subquery(rows, output_field=IntegerField()), 0)
+    return queryset.annotate(**annotations)
+
+
+def recount(user_id):
+    """Пересчитывает и сохраняет счётчики одного пользователя."""
+    user = counted(User.objects.filter(pk=user_id)).get()
+    stats, _ = AuthorStats.objects.update_or_create(
+        user_id=user_id,
+        defaults={counter: getattr(user, f'actual_{counter}')
+                  for counter in COUNTERS})
+    return stats
+
+
+def change(user_id, counter, delta):
+    """Сдвигает счётчик пользователя на delta одним UPDATE.
+
+    Если строки ещё нет, при увеличении она создаётся пересчётом, а при
+    уменьшении изменение пропускается: так удаление пользователя каскадом
+    не воссоздаёт его счётчики, а расхождения исправляет
+    reconcile_author_stats.
+    """
+    rows = AuthorStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        rows = rows.filter(**{f'{counter}__gte': -delta})
+    with transaction.atomic():
+        updated = rows.update(**{counter: F(counter) + delta})
+        if updated or delta < 0:
+            return
+        try:
+            with transaction.atomic():
+                recount(user_id)
+        except IntegrityError:
+            # Строку только что создал параллельный запрос.
+            rows.update(**{counter: F(counter) + delta})
+
+
+def for_author(author):
+    """Счётчики автора; отсутствующая строка создаётся пересчётом."""
+    try:
+        return author.stats
+    except AuthorStats.DoesNotExist:
+        return recount(author.pk)
+
+
+def reconcile(batch_size=BATCH_SIZE):
+    """Сверяет все счётчики с данными и чинит расхождения.
+
+    Возвращает число исправленных или созданных строк.
+    """
+    fixed = 0
+    users = counted(User.objects.order_by('pk').select_related('stats'))
+    last_pk = 0
+    while True:
+        batch = list(users.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return fixed
+        last_pk = batch[-1].pk
+        drifted, missing = [], []
+        for user in batch:
+            actual = {counter: getattr(user, f'actual_{counter}')
+                      for counter in COUNTERS}
+            try:
+                stats = user.stats
+            except AuthorStats.DoesNotExist:
+                missing.append(AuthorStats(user=user, **actual))
+                continue
+            if any(getattr(stats, counter) != value
+                   for counter, value in actual.items()):
+                for counter, value in actual.items():
+                    setattr(stats, counter, value)
+                drifted.append(stats)
+        with transaction.atomic():
+            AuthorStats.objects.bulk_create(missing, ignore_conflicts=True)
+            AuthorStats.objects.bulk_update(drifted, list(COUNTERS))
+        fixed += len(drifted) + len(missing)
@@ -0,0 +1,72 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page, on_each_side=2):
+    """Номера страниц вокруг текущей: первая, соседи и многоточия.
+
+    Возвращает пары (номер, строка запроса); вместо многоточия номер
+    равен None. Для страниц ключевого пагинатора общее число страниц
+    неизвестно, поэтому справа окно обрывается на следующей странице.
+    """
+    number = page.number
+    num_pages = getattr(page.paginator, 'num_pages', None)
+    if num_pages is None:
+        last = number + 1 if page.has_next() else number
+    else:
+        last = num_pages
+    start = max(number - on_each_side, 1)
+    end = min(number + on_each_side, last)
+    window = []
+    if start > 1:
+        window.append((1, 'page=1'))
+        if start > 2:
+            window.append((None, ''))
+    for i in range(start, end + 1):
+        window.append((i, page_query(page, i)))
+    if end < last:
+        if end < last - 1:
+            window.append((None, ''))
+        if num_pages is not None:
+            window.append((last, f'page={last}'))
+    return window
+
+
+def page_query(page, number):
+    """Строка запроса для перехода на страницу number."""
+    if number == page.number - 1 and getattr(page, 'previous_cursor', None):
+        return f'before={page.previous_cursor}'
+    if number == page.number + 1 and getattr(page, 'next_cursor', None):
+        return f'after={page.next_cursor}'
+    return f'page={number}'
+
+
+@register.simple_tag
+def prefetch_post_images(posts):
+    """Находит миниатюры карточек всех постов страницы разом, чтобы
+    post_image не ходил за каждой в хранилище ключей sorl."""
+    posts = list(posts)
+    contexts = thumbnails.card_images(posts)
+    for post in posts:
+        post.card_image = contexts[post.pk]
+    return ''
+
+
+@register.inclusion_tag('include/post_image.html')
+def post_image(post):
+    """Картинка карточки поста: srcset по ширинам из
+    posts.thumbnails.CARD_WIDTHS и вариант в WebP, если он есть.
+
+    Ширины выбираются по сохранённой ширине картинки, а размеры <img>
+    следуют из пропорции карточки — файл при отрисовке не открывается.
+    Миниатюры берутся из prefetch_post_images, а без него ищутся для
+    одного поста.
+    """
+    context = getattr(post, 'card_image', None)
+    if context is None:
+        context = thumbnails.card_images([post])[post.pk]
+    return context
@@ -0,0 +1,87 @@
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.paginator import EstimatedCountPaginator
+from posts.models import Comment, Follow, Post, User
+
+POST_CHANGELIST_URL = reverse('admin:posts_post_changelist')
+COMMENT_CHANGELIST_URL = reverse('admin:posts_comment_changelist')
+FOLLOW_CHANGELIST_URL = reverse('admin:posts_follow_changelist')
+
+
+class LargeTableAdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create(username='admin', is_staff=True,
+                                        is_superuser=True)
+        cls.author = User.objects.create(username='author')
+        for i in range(5):
+            post = Post.objects.create(text=f'Пост номер {i}',
+                                       author=cls.author)
+        Post.objects.create(text='Кот на окне', author=cls.admin)
+        Comment.objects.create(post=post, author=cls.admin,
+                               text='Кот в комментарии')
+        Follow.objects.create(user=cls.admin, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def changelist(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl']
+
+    def test_no_count_star_on_full_table(self):
+        """Список всей таблицы не выполняет COUNT(*) и не запрашивает
+        авторов построчно."""
+        with CaptureQueriesContext(connection) as queries:
+            self.changelist(POST_CHANGELIST_URL)
+        sql = [query['sql'] for query in queries]
+        self.assertFalse([query for query in sql if 'COUNT(*)' in query])
+        self.assertFalse([query for query in sql
+                          if query.startswith('SELECT "auth_user"')
+                          and '"auth_user"."id" =' in query
+                          and 'posts_post' not in query][1:])
+
+    def test_text_search_uses_full_text_index(self):
+        """Поиск по тексту идёт через полнотекстовый индекс."""
+        with CaptureQueriesContext(connection) as queries:
+            changelist = self.changelist(POST_CHANGELIST_URL, q='кот')
+        self.assertEqual([post.text for post in changelist.result_list],
+                         ['Кот на окне'])
+        self.assertTrue([query for query in queries
+                         if 'posts_search' in query['sql']])
+        self.assertNotIn('LIKE', ' '.join(query['sql']
+                                          for query in queries))
+        changelist = self.changelist(COMMENT_CHANGELIST_URL, q='кот')
+        self.assertEqual(changelist.result_count, 1)
+
+    def test_exact_username_search(self):
+        """Поиск по имени автора — точное совпадение."""
+        changelist = self.changelist(POST_CHANGELIST_URL, q='author')
+        self.assertEqual(changelist.result_count, 5)
+        changelist = self.changelist(FOLLOW_CHANGELIST_URL, q='auth')
+        self.assertEqual(changelist.result_count, 0)
+        changelist = self.changelist(FOLLOW_CHANGELIST_URL, q='author')
+        self.assertEqual(changelist.result_count, 1)
+
+    def test_estimated_count(self):
+        """Число строк всей таблицы оценивается, выборки — считаются."""
+        self.assertEqual(
+            EstimatedCountPaginator(Post.objects.all(), 10).count,
+            Post.objects.latest('pk').pk)
+        self.assertEqual(EstimatedCountPaginator(
+            Post.objects.filter(author=self.author), 10).count, 5)
+
+    def test_edit_form_uses_autocomplete(self):
+        """Форма поста не выгружает всех пользователей в <select>."""
+        post = Post.objects.first()
+        response = self.client.get(
+            reverse('admin:posts_post_change', args=[post.pk]))
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, '<option value="{}">author'
+                               .format(self.author.pk))
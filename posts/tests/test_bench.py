@@ -0,0 +1,84 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from posts.models import AuthorStats, Comment, Follow, Post, User
+
+VIEWS = ['index', 'group_posts', 'profile', 'post_view', 'follow_index']
+
+
+class SeedAndBenchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('seed_posts', '--users', '30', '--groups', '3',
+                     '--posts', '300', '--comments', '100',
+                     '--follows', '60', '--batch-size', '100',
+                     stdout=StringIO())
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_seed_is_power_law(self):
+        """Данные созданы, активность авторов распределена неравномерно."""
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertEqual(Follow.objects.count(), 60)
+        counts = sorted(AuthorStats.objects.values_list('posts_count',
+                                                        flat=True))
+        self.assertGreater(counts[-1], 5 * max(counts[len(counts) // 2], 1))
+
+    def bench(self, *args):
+        call_command('bench_views', '--requests', '2', '--warmup', '0',
+                     *args, stdout=StringIO())
+
+    def test_bench_saves_results(self):
+        """Результаты замеров сохраняются в JSON по каждой странице."""
+        output = os.path.join(self.directory, 'bench.json')
+        self.bench('--output', output)
+        with open(output) as file:
+            results = json.load(file)
+        self.assertEqual(sorted(results), sorted(VIEWS))
+        for view in VIEWS:
+            self.assertGreater(results[view]['queries'], 0)
+
+    def test_bench_fails_on_regression(self):
+        """Превышение эталона завершает команду ошибкой."""
+        baseline = os.path.join(self.directory, 'baseline.json')
+        with open(baseline, 'w') as file:
+            json.dump({view: {'p50_ms': 0, 'p95_ms': 0, 'queries': 0}
+                       for view in VIEWS}, file)
+        with self.assertRaises(CommandError):
+            self.bench('--baseline', baseline, '--cold')
+
+    def test_benchmarks_keep_shared_cache(self):
+        """Замеры очищают свой временный кэш, а не общий."""
+        cache.set('bench-test', 1)
+        self.bench('--cold')
+        call_command('bench_compression', '--requests', '1',
+                     stdout=StringIO())
+        self.assertEqual(cache.get('bench-test'), 1)
+
+    def test_bench_compression(self):
+        """Замер сжатия показывает выигрыш в байтах по каждой странице."""
+        output = os.path.join(self.directory, 'compression.json')
+        call_command('bench_compression', '--requests', '2',
+                     '--output', output, stdout=StringIO())
+        with open(output) as file:
+            results = json.load(file)
+        self.assertEqual(sorted(results), sorted(VIEWS))
+        for result in results.values():
+            self.assertLess(result['stripped_bytes'],
+                            result['original_bytes'])
+            self.assertLess(result['gzip_bytes'], result['stripped_bytes'])
@@ -1,11 +1,20 @@
+import threading
+from unittest import mock
+
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.db import connection, transaction
+from django.test import Client, TestCase, TransactionTestCase
 from django.urls import reverse
 
-from posts.models import Post, User
+from core import testing
+from posts import feed_cache, search
+from posts.models import Comment, Group, Post, User
 
 USERNAME = 'test'
+GROUP_SLUG = 'test-slug'
 URL_INDEX = reverse('posts:index')
+URL_GROUP = reverse('posts:group_posts', args=[GROUP_SLUG])
+URL_PROFILE = reverse('posts:profile', args=[USERNAME])
 
 
 class TaskPagesTests(TestCase):
@@ -13,21 +22,100 @@ class TaskPagesTests(TestCase):
     def setUpClass(cls):
         super().setUpClass()
         cls.test_user = User.objects.create(username=USERNAME)
+        cls.group = Group.objects.create(
+            title='Заголовок',
+            slug=GROUP_SLUG,
+            description='Тестовое описание',
+        )
         cls.post = Post.objects.create(
             text='Тестовое описание поста',
             author=cls.test_user,
+            group=cls.group,
         )
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
     def test_pages_uses_correct_template(self):
         """Кэширование данных на главной странице работает корректно"""
         response = self.guest_client.get(URL_INDEX)
         cached_response_content = response.content
-        Post.objects.create(text='Второй пост', author=self.test_user)
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
         response = self.guest_client.get(URL_INDEX)
         self.assertEqual(cached_response_content, response.content)
         cache.clear()
         response = self.guest_client.get(URL_INDEX)
         self.assertNotEqual(cached_response_content, response.content)
+
+    def test_new_post_invalidates_feeds(self):
+        """Новый пост сразу виден во всех закэшированных лентах."""
+        for url in [URL_INDEX, URL_GROUP, URL_PROFILE]:
+            self.guest_client.get(url)
+        with testing.run_on_commit():
+            Post.objects.create(text='Второй пост', author=self.test_user,
+                                group=self.group)
+        for url in [URL_INDEX, URL_GROUP, URL_PROFILE]:
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url),
+                                    'Второй пост')
+
+    def test_comment_invalidates_feeds(self):
+        """Новый комментарий обновляет счётчик в ленте."""
+        self.guest_client.get(URL_INDEX)
+        with testing.run_on_commit():
+            Comment.objects.create(post=self.post, author=self.test_user,
+                                   text='Комментарий')
+        self.assertContains(self.guest_client.get(URL_INDEX),
+                            'Комментариев: 1')
+
+    def test_post_edit_invalidates_old_group(self):
+        """Перенос поста в другую группу убирает его из старой."""
+        self.guest_client.get(URL_GROUP)
+        self.post.group = None
+        with testing.run_on_commit():
+            self.post.save()
+        self.assertNotContains(self.guest_client.get(URL_GROUP),
+                               'Тестовое описание поста')
+
+
+class OpenTransactionTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username=USERNAME)
+        self.guest_client = Client()
+
+    def test_render_during_write_keeps_generation(self):
+        """Страница, отрисованная до фиксации записи, не кэшируется под
+        новым поколением: после фиксации новый пост виден."""
+        self.guest_client.get(URL_INDEX)
+        generations = feed_cache.generations('all')
+        saved, resume = threading.Event(), threading.Event()
+        index = search.index
+
+        def paused_index(*args):
+            # Сигнал поиска идёт после сигнала кэша лент.
+            index(*args)
+            saved.set()
+            resume.wait(5)
+
+        def write():
+            try:
+                with mock.patch.object(search, 'index', paused_index):
+                    with transaction.atomic():
+                        Post.objects.create(text='Второй пост',
+                                            author=self.user)
+            finally:
+                connection.close()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            self.assertTrue(saved.wait(5))
+            self.assertEqual(feed_cache.generations('all'), generations)
+            self.assertNotContains(self.guest_client.get(URL_INDEX),
+                                   'Второй пост')
+        finally:
+            resume.set()
+            writer.join()
+        self.assertContains(self.guest_client.get(URL_INDEX), 'Второй пост')
@@ -1,7 +1,12 @@
+from django.core.cache import cache
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from posts.models import Comment, Post, User
+from posts.paginator import encode_cursor
+from posts.views import COMMENTS_PER_PAGE
 
 USERNAME = 'test'
 
@@ -17,6 +22,7 @@ class TaskPagesTests(TestCase):
         )
         cls.ADD_COMMENT_URL = reverse('posts:add_comment',
                                       args=[USERNAME, cls.post.id])
+        cls.POST_URL = reverse('posts:post', args=[USERNAME, cls.post.id])
 
     def setUp(self):
         self.guest_client = Client()
@@ -39,3 +45,43 @@ class TaskPagesTests(TestCase):
         count_comments = Comment.objects.count()
         self.guest_client.post(TaskPagesTests.ADD_COMMENT_URL)
         self.assertEqual(count_comments, Comment.objects.count())
+
+    def create_comments(self, count):
+        Comment.objects.bulk_create(
+            Comment(post=TaskPagesTests.post, author=self.test_user,
+                    text=f'Комментарий {i}')
+            for i in range(count))
+
+    def test_comments_paginated(self):
+        """Комментарии выводятся порциями с кнопкой «Показать ещё»"""
+        self.create_comments(COMMENTS_PER_PAGE + 5)
+        response = self.guest_client.get(TaskPagesTests.POST_URL)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertContains(response, comments.next_cursor)
+        response = self.guest_client.get(
+            TaskPagesTests.POST_URL, {'comments_after': comments.next_cursor})
+        self.assertEqual(len(response.context['comments']), 5)
+        self.assertFalse(response.context['comments'].has_next())
+
+    def test_tampered_comments_cursor(self):
+        """Подделанный токен комментариев отдаёт их первую порцию"""
+        self.create_comments(COMMENTS_PER_PAGE + 5)
+        response = self.guest_client.get(
+            TaskPagesTests.POST_URL,
+            {'comments_after': encode_cursor(2, 'zzz', 1)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['comments']),
+                         COMMENTS_PER_PAGE)
+
+    def test_comment_queries_do_not_grow(self):
+        """Авторы комментариев загружаются тем же запросом"""
+        self.create_comments(1)
+        cache.clear()
+        with CaptureQueriesContext(connection) as single:
+            self.guest_client.get(TaskPagesTests.POST_URL)
+        self.create_comments(COMMENTS_PER_PAGE)
+        cache.clear()
+        with CaptureQueriesContext(connection) as full:
+            self.guest_client.get(TaskPagesTests.POST_URL)
+        self.assertEqual(len(full), len(single))
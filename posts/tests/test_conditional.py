@@ -0,0 +1,135 @@
+import gzip
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import testing
+from posts import feed_cache
+from posts.models import Comment, Follow, Group, Post, User
+
+USERNAME = 'test'
+OTHER_USERNAME = 'other'
+INDEX_URL = reverse('posts:index')
+PROFILE_URL = reverse('posts:profile', args=[USERNAME])
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_user = User.objects.create(username=USERNAME)
+        cls.other_user = User.objects.create(username=OTHER_USERNAME)
+        cls.post = Post.objects.create(
+            text='Тестовое описание поста',
+            author=cls.test_user,
+        )
+        cls.POST_URL = reverse('posts:post', args=[USERNAME, cls.post.id])
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def revalidate(self, url, response):
+        return self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def later(self, url):
+        """Ответ, полученный через пару секунд после изменения ленты."""
+        clock = mock.Mock(time=mock.Mock(return_value=time.time() + 2))
+        with mock.patch.object(feed_cache, 'time', clock):
+            return self.guest_client.get(url)
+
+    def test_unchanged_pages_return_304(self):
+        """Неизменившиеся страницы отдаются как 304 Not Modified."""
+        for url in [INDEX_URL, PROFILE_URL, self.POST_URL]:
+            with self.subTest(url=url):
+                self.guest_client.get(url)
+                response = self.later(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('Last-Modified', response)
+                self.assertEqual(self.revalidate(url, response).status_code,
+                                 304)
+
+    def test_if_modified_since(self):
+        """Last-Modified ленты позволяет получить 304."""
+        self.guest_client.get(INDEX_URL)
+        response = self.later(INDEX_URL)
+        self.assertEqual(self.guest_client.get(
+            INDEX_URL,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code,
+            304)
+
+    def test_no_last_modified_in_changing_second(self):
+        """В секунду изменения Last-Modified не отдаётся: правка в ту же
+        секунду не дала бы устаревший 304 по If-Modified-Since."""
+        response = self.guest_client.get(INDEX_URL)
+        self.assertNotIn('Last-Modified', response)
+        self.assertIn('ETag', response)
+
+    def test_group_edit_changes_etags(self):
+        """Правка группы меняет ETag её ленты и лент с её постами."""
+        with testing.run_on_commit():
+            group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+            self.post.group = group
+            self.post.save()
+        group_url = reverse('posts:group_posts', args=[group.slug])
+        urls = [INDEX_URL, PROFILE_URL, self.POST_URL, group_url]
+        responses = {url: self.guest_client.get(url) for url in urls}
+        group.title = 'Новое название'
+        with testing.run_on_commit():
+            group.save()
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url, response).status_code,
+                                 200)
+
+    def test_compressed_page_served_without_rendering(self):
+        """Сжатая страница с прежним ETag отдаётся из кэша без
+        отрисовки; новый пост страницу обновляет."""
+        first = self.guest_client.get(INDEX_URL, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        with mock.patch('posts.views.render') as render:
+            second = self.guest_client.get(INDEX_URL,
+                                           HTTP_ACCEPT_ENCODING='gzip')
+        render.assert_not_called()
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', second['Vary'])
+        with testing.run_on_commit():
+            Post.objects.create(text='Второй пост', author=self.test_user)
+        third = self.guest_client.get(INDEX_URL, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertIn('Второй пост'.encode(), gzip.decompress(third.content))
+
+    def test_new_post_changes_etag(self):
+        """Новый пост меняет ETag ленты и профиля."""
+        responses = {url: self.guest_client.get(url)
+                     for url in [INDEX_URL, PROFILE_URL]}
+        with testing.run_on_commit():
+            Post.objects.create(text='Второй пост', author=self.test_user)
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url, response).status_code,
+                                 200)
+
+    def test_comment_changes_post_etag(self):
+        """Новый комментарий меняет ETag страницы поста."""
+        response = self.guest_client.get(self.POST_URL)
+        with testing.run_on_commit():
+            Comment.objects.create(post=self.post, author=self.other_user,
+                                   text='Комментарий')
+        self.assertEqual(
+            self.revalidate(self.POST_URL, response).status_code, 200)
+
+    def test_new_follower_changes_profile_etag(self):
+        """Новый подписчик меняет ETag профиля автора."""
+        response = self.guest_client.get(PROFILE_URL)
+        with testing.run_on_commit():
+            Follow.objects.create(user=self.other_user,
+                                  author=self.test_user)
+        self.assertEqual(
+            self.revalidate(PROFILE_URL, response).status_code, 200)
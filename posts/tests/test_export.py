@@ -0,0 +1,117 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Group, Post, User
+
+AUTHOR_USERNAME = 'test_author'
+READER_USERNAME = 'test_reader'
+GROUP_SLUG = 'test-slug'
+
+
+class ExportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username=AUTHOR_USERNAME)
+        cls.reader = User.objects.create(username=READER_USERNAME)
+        cls.group = Group.objects.create(title='Группа', slug=GROUP_SLUG,
+                                         description='Описание')
+        cls.posts = [
+            Post.objects.create(text=f'Пост {i}', author=cls.author,
+                                group=cls.group if i % 2 else None)
+            for i in range(5)
+        ]
+        Post.objects.create(text='Чужой пост', author=cls.reader)
+        Comment.objects.create(post=cls.posts[0], author=cls.reader,
+                               text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def export(self, *args):
+        out = StringIO()
+        call_command('export_posts', *args, stdout=out, stderr=StringIO())
+        return [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_exports_all_models(self):
+        """Выгружаются группы, посты, комментарии и подписки."""
+        records = self.export('--chunk-size', '2')
+        models = [record['model'] for record in records]
+        self.assertEqual(models, ['group'] + ['post'] * 6
+                         + ['comment', 'follow'])
+        post = records[1]
+        self.assertEqual(post['author'], AUTHOR_USERNAME)
+        self.assertEqual(post['text'], self.posts[0].text)
+        self.assertEqual(records[-1], {'model': 'follow',
+                                       'id': records[-1]['id'],
+                                       'user': READER_USERNAME,
+                                       'author': AUTHOR_USERNAME})
+
+    def test_filters(self):
+        """Фильтры по автору и группе сужают выгрузку."""
+        records = self.export('--author', READER_USERNAME)
+        self.assertEqual([r['text'] for r in records if r['model'] == 'post'],
+                         ['Чужой пост'])
+        records = self.export('--group', GROUP_SLUG)
+        posts = [r for r in records if r['model'] == 'post']
+        self.assertEqual(len(posts), 2)
+        self.assertTrue(all(r['group'] == GROUP_SLUG for r in posts))
+        self.assertFalse([r for r in records if r['model'] == 'comment'])
+
+    def test_comments_follow_post_dates(self):
+        """Комментарии отбираются по дате поста, а не по своей."""
+        Post.objects.filter(pk=self.posts[0].pk).update(
+            pub_date='2000-01-01T00:00:00Z')
+        records = self.export('--until', '2001-01-01')
+        self.assertEqual([r['model'] for r in records],
+                         ['group', 'post', 'comment', 'follow'])
+        records = self.export('--since', '2001-01-01')
+        self.assertFalse([r for r in records if r['model'] == 'comment'])
+
+    def test_resumes_from_checkpoint(self):
+        """С файлом отметок повторный запуск продолжает выгрузку."""
+        output = os.path.join(self.directory, 'posts.ndjson')
+        checkpoint = os.path.join(self.directory, 'checkpoint.json')
+        with open(checkpoint, 'w') as file:
+            json.dump({'group': self.group.pk, 'post': self.posts[2].pk},
+                      file)
+        call_command('export_posts', '--output', output,
+                     '--checkpoint', checkpoint, stderr=StringIO())
+        with open(output) as file:
+            records = [json.loads(line) for line in file]
+        posts = [r['id'] for r in records if r['model'] == 'post']
+        self.assertEqual(posts[0], self.posts[3].pk)
+        self.assertEqual(len(posts), 3)
+        with open(checkpoint) as file:
+            self.assertEqual(json.load(file)['follow'], records[-1]['id'])
+
+    def test_resume_drops_lines_after_checkpoint(self):
+        """Строки, записанные после последней отметки, не задваиваются
+        при продолжении."""
+        output = os.path.join(self.directory, 'posts.ndjson')
+        checkpoint = os.path.join(self.directory, 'checkpoint.json')
+        call_command('export_posts', '--output', output,
+                     '--checkpoint', checkpoint, '--chunk-size', '2',
+                     stderr=StringIO())
+        with open(output) as file:
+            expected = file.read()
+        with open(checkpoint) as file:
+            state = json.load(file)
+        with open(output, 'a') as file:
+            file.write('{"model": "follow", "id": 0}\n')
+        call_command('export_posts', '--output', output,
+                     '--checkpoint', checkpoint, stderr=StringIO())
+        with open(output) as file:
+            self.assertEqual(file.read(), expected)
+        with open(checkpoint) as file:
+            self.assertEqual(json.load(file), state)
@@ -20,6 +20,8 @@ SMALL_GIF = (b'\x47\x49\x46\x38\x39\x61\x02\x00'
 USERNAME = 'test'
 INDEX_URL = reverse('posts:index')
 NEW_POST_URL = reverse('posts:new_post')
+# Картинки хранятся под именами по содержимому (core.storage).
+HASHED_GIF_NAME = r'^posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.gif$'
 
 
 class PostCreateFormTests(TestCase):
@@ -82,7 +84,7 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(post.author, PostCreateFormTests.test_user)
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.group, PostCreateFormTests.group)
-        self.assertEqual(post.image, 'posts/small.gif')
+        self.assertRegex(post.image.name, HASHED_GIF_NAME)
 
     def test_new_and_edit_post_page_context(self):
         """Шаблон new_post и edit_post сформирован с правильным контекстом."""
@@ -128,7 +130,7 @@ class PostCreateFormTests(TestCase):
         self.assertRedirects(response, PostCreateFormTests.POST_URL)
         self.assertEqual(edit_post.text, form_data['text'])
         self.assertEqual(edit_post.group, other_group)
-        self.assertEqual(edit_post.image, 'posts/other_small.gif')
+        self.assertRegex(edit_post.image.name, HASHED_GIF_NAME)
         self.assertEqual(edit_post.author, PostCreateFormTests.test_user)
         self.assertEqual(Post.objects.count(), posts_count)
 
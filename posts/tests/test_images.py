@@ -0,0 +1,130 @@
+import io
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core import testing
+from posts import images
+from posts.forms import PostForm
+from posts.models import Post, User
+
+ORIENTATION = 0x0112
+GPS_INFO = 0x8825
+
+
+def jpeg(size, orientation=None):
+    exif = Image.Exif()
+    exif[GPS_INFO] = {1: 'N'}
+    if orientation:
+        exif[ORIENTATION] = orientation
+    output = io.BytesIO()
+    Image.new('RGB', size, 'red').save(output, 'JPEG', quality=100,
+                                       exif=exif.tobytes())
+    return SimpleUploadedFile('photo.jpeg', output.getvalue(),
+                              content_type='image/jpeg')
+
+
+def gif(frames=1):
+    output = io.BytesIO()
+    frames = [Image.new('P', (4, 2), color) for color in range(frames)]
+    frames[0].save(output, 'GIF', save_all=True,
+                   append_images=frames[1:])
+    return SimpleUploadedFile('small.gif', output.getvalue(),
+                              content_type='image/gif')
+
+
+class ProcessTests(TestCase):
+    def test_large_photo_is_capped_and_stripped(self):
+        """Большой снимок уменьшается, пережимается без EXIF, а вариант
+        в WebP меньше исходного."""
+        upload = jpeg((images.MAX_SIZE * 2, images.MAX_SIZE))
+        processed = images.process(upload)
+        result = Image.open(processed.image)
+        self.assertEqual(result.size, (images.MAX_SIZE,
+                                       images.MAX_SIZE // 2))
+        self.assertEqual((processed.width, processed.height), result.size)
+        self.assertNotIn('exif', result.info)
+        self.assertEqual(processed.image.name, 'photo.jpg')
+        self.assertLess(processed.image.size, upload.size)
+        self.assertEqual(processed.webp.name, 'photo.webp')
+        self.assertEqual(Image.open(processed.webp).format, 'WEBP')
+        self.assertLess(processed.webp.size, processed.image.size)
+
+    def test_exif_orientation_is_applied(self):
+        """Снимок, повёрнутый в EXIF, сохраняется повёрнутым."""
+        processed = images.process(jpeg((40, 20), orientation=6))
+        self.assertEqual((processed.width, processed.height), (20, 40))
+
+    def test_animated_gif_is_kept(self):
+        """Анимированный GIF сохраняется как есть, со всеми кадрами."""
+        upload = gif(frames=3)
+        processed = images.process(upload)
+        self.assertIs(processed.image, upload)
+        self.assertIsNone(processed.webp)
+        self.assertEqual((processed.width, processed.height), (4, 2))
+
+
+class PostFormImageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = tempfile.mkdtemp()
+        cls.override = override_settings(MEDIA_ROOT=cls.media)
+        cls.override.enable()
+        cls.user = User.objects.create(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.override.disable()
+        shutil.rmtree(cls.media, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_form_records_dimensions_and_variant(self):
+        """Форма сохраняет размеры и вариант в WebP, а при удалении
+        картинки сбрасывает их."""
+        form = PostForm({'text': 'Пост'},
+                        {'image': jpeg((images.MAX_SIZE * 2, 100))})
+        self.assertTrue(form.is_valid(), form.errors)
+        post = form.save(commit=False)
+        post.author = self.user
+        post.save()
+        post.refresh_from_db()
+        self.assertRegex(post.image.name, r'^posts/[0-9a-f/]+\.jpg$')
+        self.assertRegex(post.image_webp.name, r'^posts/[0-9a-f/]+\.webp$')
+        self.assertEqual((post.image_width, post.image_height),
+                         (images.MAX_SIZE, 50))
+        form = PostForm({'text': 'Пост', 'image-clear': 'on'},
+                        instance=post)
+        self.assertTrue(form.is_valid(), form.errors)
+        post = form.save()
+        self.assertFalse(post.image)
+        self.assertFalse(post.image_webp)
+        self.assertIsNone(post.image_width)
+
+    def test_model_save_processes_image(self):
+        """Картинка, сохранённая мимо формы (админка, код), тоже
+        пережимается и получает размеры и вариант в WebP."""
+        post = Post.objects.create(text='Пост', author=self.user,
+                                   image=jpeg((images.MAX_SIZE * 2, 100)))
+        post.refresh_from_db()
+        self.assertRegex(post.image.name, r'^posts/[0-9a-f/]+\.jpg$')
+        self.assertRegex(post.image_webp.name, r'^posts/[0-9a-f/]+\.webp$')
+        self.assertEqual((post.image_width, post.image_height),
+                         (images.MAX_SIZE, 50))
+
+    def test_feed_offers_webp_source(self):
+        """Лента отдаёт <picture> с источником в WebP."""
+        form = PostForm({'text': 'Пост'}, {'image': jpeg((200, 100))})
+        self.assertTrue(form.is_valid(), form.errors)
+        post = form.save(commit=False)
+        post.author = self.user
+        with testing.run_on_commit():
+            post.save()
+        client = Client()
+        response = client.get(reverse('posts:index'))
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, '.webp')
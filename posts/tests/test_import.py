@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from posts.models import (AuthorStats, Comment, Follow, Group, Post,
+                          TimelineEntry, User)
+
+AUTHOR_USERNAME = 'test_author'
+READER_USERNAME = 'test_reader'
+GROUP_SLUG = 'test-slug'
+RECORDS = [
+    {'model': 'group', 'id': 7, 'slug': GROUP_SLUG, 'title': 'Группа',
+     'description': 'Описание'},
+    {'model': 'post', 'id': 10, 'text': 'Первый пост',
+     'pub_date': '2020-01-01T10:00:00Z', 'author': AUTHOR_USERNAME,
+     'group': GROUP_SLUG, 'image': ''},
+    {'model': 'post', 'id': 11, 'text': 'Второй пост',
+     'pub_date': '2020-01-02T10:00:00Z', 'author': AUTHOR_USERNAME,
+     'group': None, 'image': ''},
+    {'model': 'comment', 'id': 3, 'post': 11, 'author': READER_USERNAME,
+     'text': 'Комментарий', 'created': '2020-01-03T10:00:00Z'},
+    {'model': 'comment', 'id': 4, 'post': 99, 'author': READER_USERNAME,
+     'text': 'Без поста', 'created': '2020-01-03T10:00:00Z'},
+    {'model': 'follow', 'id': 1, 'user': READER_USERNAME,
+     'author': AUTHOR_USERNAME},
+]
+
+
+class ImportMixin:
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'posts.ndjson')
+        with open(self.path, 'w', encoding='utf-8') as file:
+            for record in RECORDS:
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def load(self, *args):
+        out = StringIO()
+        call_command('import_posts', self.path, '--batch-size', '1', *args,
+                     stdout=out)
+        return out.getvalue()
+
+
+class ImportPostsTests(ImportMixin, TestCase):
+    def test_imports_records(self):
+        """Записи загружаются с датами из файла и связями по именам."""
+        output = self.load()
+        self.assertIn('строк/с', output)
+        author = User.objects.get(username=AUTHOR_USERNAME)
+        posts = Post.objects.filter(author=author).order_by('pub_date')
+        self.assertEqual([post.text for post in posts],
+                         ['Первый пост', 'Второй пост'])
+        self.assertEqual(posts[0].group, Group.objects.get(slug=GROUP_SLUG))
+        self.assertEqual(posts[0].pub_date.year, 2020)
+        comment = Comment.objects.get()
+        self.assertEqual(comment.post, posts[1])
+        self.assertEqual(comment.created.day, 3)
+        self.assertTrue(Follow.objects.filter(
+            user__username=READER_USERNAME, author=author).exists())
+
+    def test_followups(self):
+        """После загрузки пересчитаны счётчики и заполнены ленты."""
+        self.load()
+        author = User.objects.get(username=AUTHOR_USERNAME)
+        self.assertEqual(AuthorStats.objects.get(user=author).posts_count, 2)
+        self.assertEqual(
+            AuthorStats.objects.get(user=author).followers_count, 1)
+        self.assertEqual(TimelineEntry.objects.filter(
+            user__username=READER_USERNAME).count(), 2)
+
+    def test_existing_users_reused(self):
+        """Существующие пользователи и группы не дублируются."""
+        author = User.objects.create(username=AUTHOR_USERNAME)
+        self.load()
+        self.load()
+        self.assertEqual(Post.objects.filter(author=author).count(), 4)
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+
+
+class DeferredIndexesTests(ImportMixin, TransactionTestCase):
+    def test_indexes_rebuilt(self):
+        """С --defer-indexes индексы снимаются и строятся заново."""
+        self.load('--defer-indexes')
+        self.assertEqual(Post.objects.count(), 2)
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(
+                cursor, Post._meta.db_table)
+        self.assertIn('post_author_pub_date_idx', indexes)
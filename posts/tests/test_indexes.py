@@ -0,0 +1,105 @@
+import re
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import IntegrityError, connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+AUTHOR_USERNAME = 'test_author'
+READER_USERNAME = 'test_reader'
+GROUP_SLUG = 'test-slug'
+INDEX_URL = reverse('posts:index')
+GROUP_URL = reverse('posts:group_posts', args=[GROUP_SLUG])
+PROFILE_URL = reverse('posts:profile', args=[AUTHOR_USERNAME])
+FOLLOW_INDEX_URL = reverse('posts:follow_index')
+FULL_SCAN = re.compile(r'SCAN (TABLE )?(\w+)$')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class FeedIndexesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username=AUTHOR_USERNAME)
+        cls.reader = User.objects.create(username=READER_USERNAME)
+        cls.group = Group.objects.create(
+            title='Заголовок',
+            slug=GROUP_SLUG,
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(3):
+            post = Post.objects.create(text=f'Пост {i}', author=cls.author,
+                                       group=cls.group)
+            Comment.objects.create(post=post, author=cls.reader,
+                                   text='Комментарий')
+        cls.POST_URL = reverse('posts:post',
+                               args=[AUTHOR_USERNAME, post.id])
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def query_plans(self, url, table):
+        """Планы запросов страницы, читающих table с LIMIT."""
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url)
+        plans = []
+        for query in queries:
+            sql = query['sql']
+            if f'FROM "{table}"' not in sql or 'LIMIT' not in sql:
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plans.append([row[-1] for row in cursor.fetchall()])
+        self.assertTrue(plans, f'{url} не читает {table}')
+        return plans
+
+    def assert_no_full_scan(self, plan):
+        for step in plan:
+            self.assertIsNone(FULL_SCAN.match(step), plan)
+
+    def test_feeds_use_ordered_index(self):
+        """Ленты идут по составному индексу без сортировки во временном
+        B-дереве."""
+        for url in [INDEX_URL, GROUP_URL, PROFILE_URL]:
+            for plan in self.query_plans(url, 'posts_post'):
+                with self.subTest(url=url):
+                    self.assert_no_full_scan(plan)
+                    self.assertTrue(any('INDEX post_' in step
+                                        for step in plan), plan)
+                    self.assertFalse(any('TEMP B-TREE' in step
+                                         for step in plan), plan)
+
+    def test_follow_feed_uses_timeline_index(self):
+        """Лента подписок читает записи пользователя по индексу без
+        сортировки во временном B-дереве."""
+        for plan in self.query_plans(FOLLOW_INDEX_URL,
+                                     'posts_timelineentry'):
+            self.assert_no_full_scan(plan)
+            self.assertTrue(any('timeline_user_pub_date_idx' in step
+                                for step in plan), plan)
+            self.assertFalse(any('TEMP B-TREE' in step for step in plan),
+                             plan)
+
+    def test_comments_use_index(self):
+        """Комментарии поста читаются по индексу."""
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(self.POST_URL)
+        sql = next(query['sql'] for query in queries
+                   if query['sql'].startswith('SELECT "posts_comment".'))
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assert_no_full_scan(plan)
+        self.assertFalse(any('TEMP B-TREE' in step for step in plan), plan)
+
+    def test_follow_is_unique(self):
+        """Повторная подписка на автора запрещена ограничением."""
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=self.reader, author=self.author)
@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TransactionTestCase, override_settings
+
+from posts import media
+from posts.models import Post, StoredFile, User
+
+SMALL_GIF = (b'\x47\x49\x46\x38\x39\x61\x02\x00'
+             b'\x01\x00\x80\x00\x00\x00\x00\x00'
+             b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+             b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+             b'\x0A\x00\x3B')
+OTHER_GIF = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\xFF\x00')
+
+
+class StoredFileTests(TransactionTestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.override = override_settings(
+            MEDIA_ROOT=self.media, THUMBNAIL_WORKERS=0,
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': self.media,
+            }})
+        self.override.enable()
+        self.user = User.objects.create(username='author')
+        self.storage = Post._meta.get_field('image').storage
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media, ignore_errors=True)
+
+    def post(self, content=SMALL_GIF, name='small.gif'):
+        return Post.objects.create(
+            text='Пост', author=self.user,
+            image=SimpleUploadedFile(name, content,
+                                     content_type='image/gif'))
+
+    def thumbnail_files(self):
+        return [name for _, _, names in os.walk(
+            os.path.join(self.media, 'cache')) for name in names]
+
+    def references(self, name):
+        return (StoredFile.objects.filter(name=name)
+                .values_list('references', flat=True).first())
+
+    def test_identical_uploads_share_one_file(self):
+        """Одинаковые картинки двух постов — один файл с общими
+        миниатюрами; они удаляются вместе с последним постом."""
+        first = self.post(name='meme.gif')
+        second = self.post(name='repost.gif')
+        name = first.image.name
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(self.references(name), 2)
+        first.delete()
+        self.assertEqual(self.references(name), 1)
+        self.assertTrue(self.storage.exists(name))
+        self.assertTrue(self.thumbnail_files())
+        second.delete()
+        self.assertIsNone(self.references(name))
+        self.assertFalse(self.storage.exists(name))
+        self.assertEqual(self.thumbnail_files(), [])
+
+    def test_replaced_image_is_released(self):
+        """Замена картинки отпускает старый файл."""
+        post = self.post()
+        old = post.image.name
+        post.image = SimpleUploadedFile('other.gif', OTHER_GIF,
+                                        content_type='image/gif')
+        post.save()
+        self.assertFalse(self.storage.exists(old))
+        self.assertEqual(self.references(post.image.name), 1)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(self.references(post.image.name), 1)
+
+    def test_upload_during_deletion_keeps_file(self):
+        """Загрузка того же файла, пока он удаляется, не остаётся без
+        файла: удаление, дошедшее до дела после записи, видит ссылку."""
+        first = self.post()
+        name = first.image.name
+        deferred = []
+        with mock.patch.object(media.transaction, 'on_commit',
+                               deferred.append):
+            first.delete()
+        save = self.storage.save
+
+        def save_then_delete(*args, **kwargs):
+            saved = save(*args, **kwargs)
+            deferred.pop()()
+            return saved
+        with mock.patch.object(self.storage, 'save', save_then_delete):
+            second = self.post()
+        self.assertEqual(second.image.name, name)
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.references(name), 1)
+
+    def test_reconcile(self):
+        """reconcile восстанавливает счётчики по постам."""
+        post = self.post()
+        self.post()
+        StoredFile.objects.all().delete()
+        StoredFile.objects.create(name='posts/gone.gif', references=3)
+        self.assertEqual(media.reconcile(), 2)
+        self.assertEqual(self.references(post.image.name), 2)
+        self.assertIsNone(self.references('posts/gone.gif'))
+        self.assertEqual(media.reconcile(), 0)
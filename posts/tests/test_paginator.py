@@ -0,0 +1,118 @@
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.paginator import encode_cursor
+from posts.templatetags.post_tags import page_window
+from posts.views import POSTS_PER_PAGE
+
+USERNAME = 'test'
+INDEX_URL = reverse('posts:index')
+POSTS_COUNT = POSTS_PER_PAGE + 3
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_user = User.objects.create(username=USERNAME)
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.test_user)
+            for i in range(POSTS_COUNT))
+        cls.posts = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_first_page(self):
+        """Первая страница содержит POSTS_PER_PAGE новейших постов."""
+        page = self.guest_client.get(INDEX_URL).context['page']
+        self.assertEqual(list(page), self.posts[:POSTS_PER_PAGE])
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+
+    def test_next_and_previous_cursors(self):
+        """Переход вперёд и назад по токенам возвращает соседние страницы."""
+        first = self.guest_client.get(INDEX_URL).context['page']
+        second = self.guest_client.get(
+            INDEX_URL, {'after': first.next_cursor}).context['page']
+        self.assertEqual(list(second), self.posts[POSTS_PER_PAGE:])
+        self.assertEqual(second.number, 2)
+        self.assertFalse(second.has_next())
+        self.assertTrue(second.has_previous())
+        back = self.guest_client.get(
+            INDEX_URL, {'before': second.previous_cursor}).context['page']
+        self.assertEqual(list(back), list(first))
+        self.assertEqual(back.number, 1)
+        self.assertFalse(back.has_previous())
+
+    def test_legacy_page_number(self):
+        """Старые ссылки ?page=N продолжают работать."""
+        page = self.guest_client.get(
+            INDEX_URL, {'page': 2}).context['page']
+        self.assertEqual(list(page), self.posts[POSTS_PER_PAGE:])
+        self.assertEqual(page.number, 2)
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Повреждённый токен отдаёт первую страницу."""
+        page = self.guest_client.get(
+            INDEX_URL, {'after': '!!!'}).context['page']
+        self.assertEqual(list(page), self.posts[:POSTS_PER_PAGE])
+
+    def test_tampered_cursor_returns_first_page(self):
+        """Токен с ключом не того типа или огромным pk отдаёт первую
+        страницу, а не ошибку."""
+        profile_url = reverse('posts:profile', args=[USERNAME])
+        for token in (encode_cursor(2, 'garbage', 5),
+                      encode_cursor(2, self.posts[0].pub_date, 10 ** 30)):
+            for url in (INDEX_URL, profile_url):
+                for param in ('after', 'before'):
+                    with self.subTest(url=url, param=param, token=token):
+                        response = self.guest_client.get(url,
+                                                         {param: token})
+                        self.assertEqual(list(response.context['page']),
+                                         self.posts[:POSTS_PER_PAGE])
+
+    def test_huge_page_number(self):
+        """Огромный номер страницы не переполняет OFFSET."""
+        response = self.guest_client.get(
+            INDEX_URL, {'page': '999999999999999999999'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['page']), [])
+
+    def test_no_count_query(self):
+        """Лента не выполняет COUNT-запросов."""
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(INDEX_URL, {'page': 2})
+        for query in queries:
+            with self.subTest(sql=query['sql']):
+                self.assertNotIn('COUNT(', query['sql'].upper())
+
+
+class PageWindowTests(TestCase):
+    def test_window_for_numbered_pages(self):
+        """Окно содержит первую, последнюю и соседние страницы."""
+        page = Paginator(range(10000), 10).page(500)
+        numbers = [number for number, _ in page_window(page)]
+        self.assertEqual(numbers,
+                         [1, None, 498, 499, 500, 501, 502, None, 1000])
+
+    def test_window_near_start(self):
+        """У начала списка многоточие слева не выводится."""
+        page = Paginator(range(100), 10).page(2)
+        numbers = [number for number, _ in page_window(page)]
+        self.assertEqual(numbers, [1, 2, 3, 4, None, 10])
+
+    def test_window_uses_cursors_for_neighbours(self):
+        """Соседние страницы ленты адресуются токенами."""
+        user = User.objects.create(username=USERNAME)
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=user)
+            for i in range(POSTS_COUNT))
+        page = Client().get(INDEX_URL).context['page']
+        self.assertEqual(page_window(page),
+                         [(1, 'page=1'),
+                          (2, f'after={page.next_cursor}')])
@@ -0,0 +1,80 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+USERNAME = 'test'
+GROUP_SLUG = 'test-slug'
+INDEX_URL = reverse('posts:index')
+GROUP_URL = reverse('posts:group_posts', args=[GROUP_SLUG])
+PROFILE_URL = reverse('posts:profile', args=[USERNAME])
+FOLLOW_URL = reverse('posts:follow_index')
+READER_USERNAME = 'reader'
+
+
+class FeedQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_user = User.objects.create(username=USERNAME)
+        cls.group = Group.objects.create(
+            title='Заголовок',
+            slug=GROUP_SLUG,
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def create_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(text=f'Пост {i}',
+                                       author=self.test_user,
+                                       group=self.group)
+            Comment.objects.create(post=post, author=self.test_user,
+                                   text='Комментарий')
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(url)
+        return len(queries)
+
+    def test_feed_queries_do_not_grow_with_page_size(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+        for url in [INDEX_URL, GROUP_URL, PROFILE_URL]:
+            with self.subTest(url=url):
+                Post.objects.all().delete()
+                self.create_posts(1)
+                single = self.count_queries(url)
+                self.create_posts(5)
+                self.assertEqual(self.count_queries(url), single)
+
+    def test_comment_count_annotation(self):
+        """Лента отдаёт посты с подсчитанными комментариями."""
+        self.create_posts(2)
+        page = self.guest_client.get(INDEX_URL).context['page']
+        for post in page:
+            with self.subTest(post=post.pk):
+                self.assertEqual(post.comment_count, 1)
+
+    @override_settings(QUERY_BUDGET_RAISE=True)
+    def test_feeds_fit_query_budgets(self):
+        """Ленты укладываются в объявленные бюджеты запросов."""
+        self.create_posts(15)
+        reader = User.objects.create(username=READER_USERNAME)
+        Follow.objects.create(user=reader, author=self.test_user)
+        authorized_client = Client()
+        authorized_client.force_login(reader)
+        post_url = reverse('posts:post',
+                           args=[USERNAME, Post.objects.first().pk])
+        for client in [self.guest_client, authorized_client]:
+            for url in [INDEX_URL, GROUP_URL, PROFILE_URL, post_url,
+                        FOLLOW_URL]:
+                with self.subTest(url=url):
+                    cache.clear()
+                    response = client.get(url)
+                    self.assertIn('Server-Timing', response)
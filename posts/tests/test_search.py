@@ -0,0 +1,107 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import search
+from posts.models import Comment, Group, Post, User
+
+AUTHOR_USERNAME = 'test_author'
+READER_USERNAME = 'test_reader'
+GROUP_SLUG = 'test-slug'
+SEARCH_URL = reverse('posts:search')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username=AUTHOR_USERNAME)
+        cls.reader = User.objects.create(username=READER_USERNAME)
+        cls.group = Group.objects.create(title='Группа', slug=GROUP_SLUG,
+                                         description='Описание')
+        cls.post = Post.objects.create(text='Кот сидит на <b>окне</b>',
+                                       author=cls.author, group=cls.group)
+        cls.other_post = Post.objects.create(text='Собака спит',
+                                             author=cls.reader)
+        cls.comment = Comment.objects.create(post=cls.other_post,
+                                             author=cls.author,
+                                             text='А кот не спит')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def hits(self, text, **kwargs):
+        return list(search.search(text, **kwargs))
+
+    def test_finds_posts_and_comments(self):
+        """Находятся посты и комментарии, комментарий ведёт к посту."""
+        hits = self.hits('кот')
+        self.assertEqual(len(hits), 2)
+        comment_hit = next(hit for hit in hits if hit.comment)
+        self.assertEqual(comment_hit.comment, self.comment)
+        self.assertEqual(comment_hit.post, self.other_post)
+
+    def test_filters(self):
+        """Фильтры группы и автора сужают выдачу."""
+        self.assertEqual([hit.post for hit in
+                          self.hits('кот', group_id=self.group.pk)],
+                         [self.post])
+        self.assertEqual([hit.comment for hit in
+                          self.hits('спит', author_id=self.author.pk)],
+                         [self.comment])
+
+    def test_index_follows_changes(self):
+        """Правка и удаление поста сразу отражаются в индексе."""
+        self.post.text = 'Попугай'
+        self.post.save()
+        self.assertEqual([hit.post for hit in self.hits('попугай')],
+                         [self.post])
+        self.assertEqual(len(self.hits('кот')), 1)
+        self.other_post.delete()
+        self.assertEqual(self.hits('спит'), [])
+
+    def test_keyset_pages(self):
+        """Страницы выдачи идут по курсору без повторов."""
+        for i in range(5):
+            Post.objects.create(text=f'кот номер {i}', author=self.author)
+        seen = []
+        page = search.search('кот', per_page=3)
+        seen += page.object_list
+        while page.has_next():
+            page = search.search('кот', per_page=3, after=page.next_cursor)
+            seen += page.object_list
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len({(hit.post.pk, hit.comment) for hit in seen}),
+                         7)
+
+    def test_view_highlights_safely(self):
+        """Страница поиска выделяет совпадения и экранирует текст."""
+        response = self.guest_client.get(SEARCH_URL, {'q': 'окне'})
+        self.assertContains(response, '<mark>окне</mark>')
+        self.assertContains(response, '&lt;b&gt;')
+        response = self.guest_client.get(
+            SEARCH_URL, {'q': 'кот', 'group': 'missing'})
+        self.assertEqual(list(response.context['page']), [])
+
+    def test_view_skips_empty_filters(self):
+        """Без фильтров группа и автор не ищутся в базе."""
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(SEARCH_URL, {'q': 'кот'})
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotRegex(sql, r'"(slug|username)" (=|IS NULL)')
+
+    def test_operators_in_input_are_ignored(self):
+        """Операторы FTS5 во вводе не ломают запрос."""
+        self.assertEqual(len(self.hits('кот" (-')), 2)
+        self.assertEqual(self.hits('*'), [])
+
+    def test_rebuild_command(self):
+        """Команда перестраивает индекс с нуля."""
+        search._execute(f'DELETE FROM {search.TABLE}')
+        self.assertEqual(self.hits('кот'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.hits('кот')), 2)
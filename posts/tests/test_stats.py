@@ -0,0 +1,81 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import stats
+from posts.models import AuthorStats, Follow, Post, User
+
+AUTHOR_USERNAME = 'test_author'
+READER_USERNAME = 'test_reader'
+PROFILE_URL = reverse('posts:profile', args=[AUTHOR_USERNAME])
+UNFOLLOW_URL = reverse('posts:profile_unfollow', args=[AUTHOR_USERNAME])
+
+
+class AuthorStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username=AUTHOR_USERNAME)
+        cls.reader = User.objects.create(username=READER_USERNAME)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def get_stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются при создании и удалении постов и подписок."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.get_stats(self.author).posts_count, 1)
+        self.assertEqual(self.get_stats(self.author).followers_count, 1)
+        self.assertEqual(self.get_stats(self.reader).following_count, 1)
+        post.delete()
+        follow.delete()
+        self.assertEqual(self.get_stats(self.author).posts_count, 0)
+        self.assertEqual(self.get_stats(self.author).followers_count, 0)
+        self.assertEqual(self.get_stats(self.reader).following_count, 0)
+
+    def test_unfollow_is_atomic(self):
+        """Ошибка при обновлении счётчиков откатывает отписку."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        client = Client()
+        client.force_login(self.reader)
+        with mock.patch.object(stats, 'change', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                client.get(UNFOLLOW_URL)
+        self.assertTrue(Follow.objects.filter(user=self.reader,
+                                              author=self.author).exists())
+
+    def test_concurrent_row_creation(self):
+        """Строку счётчиков, созданную параллельным запросом, change не
+        создаёт повторно и не падает."""
+        AuthorStats.objects.filter(user=self.author).delete()
+        with mock.patch.object(stats, 'recount', side_effect=IntegrityError):
+            stats.change(self.author.pk, 'posts_count', 1)
+        self.assertFalse(AuthorStats.objects.filter(user=self.author)
+                         .exists())
+
+    def test_profile_uses_stats(self):
+        """Шапка профиля читает счётчики из AuthorStats."""
+        Post.objects.create(text='Пост', author=self.author)
+        response = self.guest_client.get(PROFILE_URL)
+        self.assertEqual(response.context['stats'].posts_count, 1)
+        self.assertContains(response, 'Записей: 1')
+
+    def test_reconcile_fixes_drift(self):
+        """reconcile_author_stats исправляет рассинхронизацию."""
+        Post.objects.create(text='Пост', author=self.author)
+        AuthorStats.objects.filter(user=self.author).update(
+            posts_count=5, followers_count=3)
+        AuthorStats.objects.filter(user=self.reader).delete()
+        call_command('reconcile_author_stats', stdout=StringIO())
+        stats = self.get_stats(self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 0)
+        self.assertTrue(AuthorStats.objects.filter(user=self.reader).exists())
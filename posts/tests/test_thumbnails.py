@@ -0,0 +1,164 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.cached_db_kvstore import \
+    KVStore as CachedDBKVStore
+
+from posts import thumbnails
+from posts.models import Post, User
+
+SMALL_GIF = (b'\x47\x49\x46\x38\x39\x61\x02\x00'
+             b'\x01\x00\x80\x00\x00\x00\x00\x00'
+             b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+             b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+             b'\x0A\x00\x3B')
+OTHER_GIF = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\xFF\x00')
+
+
+class ThumbnailTests(TransactionTestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        # Ключи sorl в кэше не должны переживать тест: имена картинок
+        # у тестов совпадают.
+        self.override = override_settings(
+            MEDIA_ROOT=self.media, THUMBNAIL_WORKERS=0,
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': self.media,
+            }})
+        self.override.enable()
+        self.user = User.objects.create(username='author')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media, ignore_errors=True)
+
+    def upload(self, name='small.gif', content=SMALL_GIF):
+        return SimpleUploadedFile(name, content, content_type='image/gif')
+
+    def cached(self, post):
+        """Есть ли все миниатюры картинки в хранилище ключей sorl."""
+        source = default.kvstore.get(ImageFile(post.image))
+        return source is not None and len(default.kvstore._get(
+            source.key, identity='thumbnails') or []) == len(
+                thumbnails.card_widths(post.image_width))
+
+    def test_new_post_generates_thumbnails(self):
+        """Миниатюры новой картинки готовы до первой отрисовки."""
+        self.client.post(reverse('posts:new_post'),
+                         {'text': 'Пост', 'image': self.upload()})
+        post = Post.objects.get()
+        with mock.patch.object(default.engine, 'create') as create:
+            response = self.client.get(
+                reverse('posts:post', args=['author', post.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.cached(post))
+        create.assert_not_called()
+
+    def test_edit_without_new_image_skips_generation(self):
+        """Правка текста не ставит миниатюры в очередь заново."""
+        post = Post.objects.create(text='Пост', author=self.user,
+                                   image=self.upload())
+        with mock.patch.object(thumbnails, 'schedule_post') as schedule:
+            self.client.post(
+                reverse('posts:post_edit', args=['author', post.pk]),
+                {'text': 'Новый текст'})
+            schedule.assert_not_called()
+            self.client.post(
+                reverse('posts:post_edit', args=['author', post.pk]),
+                {'text': 'Новый текст',
+                 'image': self.upload('other.gif', OTHER_GIF)})
+            schedule.assert_called_once()
+
+    @override_settings(THUMBNAIL_WORKERS=1)
+    def test_pool_runs_off_request(self):
+        """С пулом миниатюры создаются в другом потоке."""
+        post = Post(text='Пост', author=self.user)
+        post.image.save('small.gif', self.upload(), save=False)
+        with mock.patch.object(thumbnails, 'generate') as generate:
+            thumbnails.schedule(post.image)
+            pool, _ = thumbnails._get_pool()
+            pool.submit(lambda: None).result()
+        generate.assert_called_once_with(post.image, thumbnails.CARD_WIDTHS)
+
+    def test_backfill_command(self):
+        """Команда создаёт миниатюры уже загруженных картинок."""
+        with mock.patch.object(thumbnails, 'schedule_post'):
+            post = Post.objects.create(text='Пост', author=self.user,
+                                       image=self.upload())
+        self.assertFalse(self.cached(post))
+        call_command('generate_thumbnails', '--workers', '2',
+                     stdout=mock.MagicMock())
+        self.assertTrue(self.cached(post))
+
+    def test_post_image_tag(self):
+        """Тег отдаёт srcset по ширинам не шире картинки, ленивую
+        загрузку и размеры из пропорции карточки."""
+        post = Post.objects.create(text='Пост', author=self.user,
+                                   image=self.upload())
+        post.image_width = 600
+        html = Template('{% load post_tags %}{% post_image post %}').render(
+            Context({'post': post}))
+        self.assertIn('loading="lazy"', html)
+        self.assertIn('360w', html)
+        self.assertIn('540w', html)
+        self.assertNotIn('720w', html)
+        width, height = thumbnails.card_geometry(540)
+        self.assertIn(f'width="{width}" height="{height}"', html)
+        self.assertNotIn('image/webp', html)
+
+    def sorl_keys(self, keys):
+        return [key for key in keys
+                if key.startswith(thumbnail_settings.THUMBNAIL_KEY_PREFIX)]
+
+    def test_page_thumbnails_in_one_lookup(self):
+        """Миниатюры всех карточек страницы ищутся одним get_many, без
+        запросов к таблице хранилища ключей."""
+        for i in range(3):
+            Post.objects.create(text=f'Пост {i}', author=self.user,
+                                image=self.upload(f'small{i}.gif'))
+        Post.objects.create(text='Без картинки', author=self.user)
+        with mock.patch.object(CachedDBKVStore, '_get_raw', autospec=True,
+                               side_effect=CachedDBKVStore._get_raw
+                               ) as get, \
+                mock.patch.object(LocMemCache, 'get_many', autospec=True,
+                                  side_effect=LocMemCache.get_many
+                                  ) as get_many, \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'srcset=', count=3)
+        get.assert_not_called()
+        lookups = [keys for keys in (self.sorl_keys(call[0][1])
+                                     for call in get_many.call_args_list)
+                   if keys]
+        self.assertEqual(len(lookups), 1)
+        self.assertFalse([query for query in queries
+                          if 'thumbnail_kvstore' in query['sql']])
+
+    def test_broken_image_is_remembered(self):
+        """Картинку без исходника не пытаются открыть при каждой
+        отрисовке."""
+        with mock.patch.object(thumbnails, 'schedule_post'):
+            post = Post.objects.create(text='Пост', author=self.user,
+                                       image='posts/missing.gif')
+        with self.assertLogs('posts.thumbnails', 'ERROR'):
+            contexts = thumbnails.card_images([post])
+        self.assertEqual(contexts, {post.pk: {}})
+        with mock.patch.object(thumbnails, 'card_thumbnail') as create:
+            self.assertEqual(thumbnails.card_images([post]), {post.pk: {}})
+        create.assert_not_called()
@@ -0,0 +1,94 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry, User
+
+AUTHOR_USERNAME = 'test_author'
+READER_USERNAME = 'test_reader'
+FOLLOW_URL = reverse('posts:profile_follow', args=[AUTHOR_USERNAME])
+UNFOLLOW_URL = reverse('posts:profile_unfollow', args=[AUTHOR_USERNAME])
+FOLLOW_INDEX_URL = reverse('posts:follow_index')
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username=AUTHOR_USERNAME)
+        cls.reader = User.objects.create(username=READER_USERNAME)
+        cls.old_post = Post.objects.create(text='Старый пост',
+                                           author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def timeline_posts(self):
+        return set(TimelineEntry.objects.filter(
+            user=self.reader).values_list('post_id', flat=True))
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту уже опубликованные посты автора."""
+        self.reader_client.get(FOLLOW_URL)
+        self.assertEqual(self.timeline_posts(), {self.old_post.pk})
+
+    def test_new_post_fans_out(self):
+        """Новый пост раскладывается по лентам подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertIn(post.pk, self.timeline_posts())
+
+    def test_unfollow_trims_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.reader_client.get(UNFOLLOW_URL)
+        self.assertEqual(self.timeline_posts(), set())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_celebrity_posts_merged_on_read(self):
+        """Посты популярных авторов не раскладываются, но видны в ленте."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertNotIn(post.pk, self.timeline_posts())
+        page = self.reader_client.get(FOLLOW_INDEX_URL).context['page']
+        self.assertEqual(list(page), [post, self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_merged_feed_paginated_by_cursor(self):
+        """Материализованная лента и посты популярных авторов листаются
+        токенами без пропусков и повторов."""
+        other = User.objects.create(username='other_author')
+        Follow.objects.create(user=self.reader, author=other)
+        with override_settings(TIMELINE_FANOUT_LIMIT=1000):
+            Post.objects.bulk_create(
+                Post(text=f'Пост {i}', author=other) for i in range(6))
+            TimelineEntry.objects.bulk_create(
+                TimelineEntry(user=self.reader, post=post,
+                              pub_date=post.pub_date)
+                for post in Post.objects.filter(author=other))
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=self.author) for i in range(6))
+        expected = list(Post.objects.filter(
+            author__in=[self.author, other]).order_by('-pub_date', '-pk'))
+        seen, params = [], {}
+        while True:
+            page = self.reader_client.get(FOLLOW_INDEX_URL,
+                                          params).context['page']
+            seen += list(page)
+            if not page.has_next():
+                break
+            params = {'after': page.next_cursor}
+        self.assertEqual(seen, expected)
+
+    def test_demoted_author_refilled(self):
+        """Посты автора, написанные, пока он был популярен, попадают в
+        ленты, когда подписчиков становится не больше предела."""
+        other_reader = User.objects.create(username='other_reader')
+        with override_settings(TIMELINE_FANOUT_LIMIT=1):
+            Follow.objects.create(user=self.reader, author=self.author)
+            Follow.objects.create(user=other_reader, author=self.author)
+            post = Post.objects.create(text='Новый пост', author=self.author)
+            self.assertNotIn(post.pk, self.timeline_posts())
+            Follow.objects.filter(user=other_reader).delete()
+        self.assertEqual(self.timeline_posts(), {self.old_post.pk, post.pk})
@@ -0,0 +1,219 @@
+"""Миниатюры картинок постов.
+
+Карточка поста показывает картинку, обрезанную до CARD_RATIO, в
+нескольких ширинах CARD_WIDTHS (srcset, см. тег post_image). Если
+миниатюры ещё нет, sorl создаёт её прямо во время отрисовки. Чтобы
+этим не платил первый зритель, после сохранения поста миниатюры
+создаются в фоновом пуле из THUMBNAIL_WORKERS потоков.
+
+Тег {% thumbnail %} ищет каждую миниатюру в хранилище ключей sorl
+отдельным запросом. card_images находит миниатюры всех карточек
+страницы одним get_many к кэшу, а промахи дочитывает из таблицы
+хранилища одним запросом; это рассчитано на хранилище cached_db,
+которое sorl использует по умолчанию, а закрытые детали sorl собраны
+в sorl_compat. Картинка, миниатюры которой создать не удалось,
+запоминается на MISSING_TIMEOUT секунд, и её исходник не открывается
+при каждой отрисовке.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from .sorl_compat import EMPTY_VALUE, kvstore_cache, thumbnail_file
+
+logger = logging.getLogger(__name__)
+
+CARD_WIDTHS = (360, 540, 720, 960)
+CARD_RATIO = 339 / 960
+CARD_OPTIONS = {'crop': 'center', 'upscale': True}
+CARD_SIZES = '(max-width: 960px) 100vw, 960px'
+# Поля картинок поста и дополнительные параметры их миниатюр: вариант
+# в WebP должен давать миниатюры в WebP, а не в JPEG по умолчанию.
+FIELDS = {
+    'image': {},
+    'image_webp': {'format': 'WEBP'},
+}
+# Столько картинок на поток может ждать очереди; сверх этого задание
+# отбрасывается, и миниатюру создаст отрисовка.
+QUEUE_PER_WORKER = 16
+MISSING_TIMEOUT = 10 * 60
+
+_lock = threading.Lock()
+_pool = None
+
+
+def card_geometry(width):
+    return width, round(width * CARD_RATIO)
+
+
+def card_widths(image_width=None):
+    """Ширины карточки, не превышающие ширину картинки: растянутая
+    миниатюра весит больше, но чётче не становится. Самая узкая
+    остаётся всегда; без известной ширины — все."""
+    if not image_width:
+        return CARD_WIDTHS
+    return tuple(width for width in CARD_WIDTHS
+                 if width <= image_width) or CARD_WIDTHS[:1]
+
+
+def card_thumbnail(image, width, **extra):
+    return get_thumbnail(image, '{}x{}'.format(*card_geometry(width)),
+                         **CARD_OPTIONS, **extra)
+
+
+def generate(image, widths=CARD_WIDTHS, **extra):
+    """Создаёт миниатюры картинки, если их ещё нет."""
+    for width in widths:
+        card_thumbnail(image, width, **extra)
+
+
+def _run(image, widths, extra, slots):
+    try:
+        generate(image, widths, **extra)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры %s', image)
+    finally:
+        slots.release()
+        # Соединения с БД у каждого потока свои.
+        connections.close_all()
+
+
+def _get_pool():
+    """Пул процесса; после fork потоки родителя недоступны, и пул
+    создаётся заново."""
+    global _pool
+    with _lock:
+        if _pool is None or _pool[0] != os.getpid():
+            workers = settings.THUMBNAIL_WORKERS
+            _pool = (os.getpid(),
+                     ThreadPoolExecutor(workers, 'thumbnails'),
+                     threading.BoundedSemaphore(workers * QUEUE_PER_WORKER))
+        return _pool[1:]
+
+
+def schedule(image, widths=CARD_WIDTHS, **extra):
+    """Ставит создание миниатюр в очередь пула; при THUMBNAIL_WORKERS=0
+    создаёт их сразу."""
+    if not image:
+        return
+    if not settings.THUMBNAIL_WORKERS:
+        generate(image, widths, **extra)
+        return
+    pool, slots = _get_pool()
+    if not slots.acquire(blocking=False):
+        logger.warning('Очередь миниатюр заполнена, %s пропущена', image)
+        return
+    pool.submit(_run, image, widths, extra, slots)
+
+
+def schedule_post(post):
+    widths = card_widths(post.image_width)
+    for field, extra in FIELDS.items():
+        schedule(getattr(post, field), widths, **extra)
+
+
+def _card_file(image, width, **extra):
+    geometry = '{}x{}'.format(*card_geometry(width))
+    return thumbnail_file(image, geometry, **CARD_OPTIONS, **extra)
+
+
+def _fetch(keys):
+    """Промахи кэша дочитываются из таблицы хранилища одним запросом и
+    кладутся в кэш; отсутствующие ключи кэшируются так же, как это
+    делает само хранилище."""
+    found = dict(KVStore.objects.filter(key__in=keys)
+                 .values_list('key', 'value'))
+    fetched = {key: found.get(key, EMPTY_VALUE) for key in keys}
+    kvstore_cache().set_many(
+        fetched, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT)
+    return fetched
+
+
+def _missing_key(image):
+    return add_prefix(ImageFile(image).key, 'missing')
+
+
+def _card_image(post, widths, found):
+    candidates = {}
+    for field, extra in FIELDS.items():
+        image = getattr(post, field)
+        if not image:
+            continue
+        candidates[field] = []
+        for width in widths:
+            thumbnail = found.get((post.pk, field, width))
+            if thumbnail is None:
+                thumbnail = card_thumbnail(image, width, **extra)
+                if not thumbnail.exists():
+                    raise FileNotFoundError(thumbnail.name)
+            candidates[field].append((thumbnail.url, width))
+    width, height = card_geometry(widths[-1])
+    webp = candidates.get('image_webp')
+    return {
+        'src': candidates['image'][-1][0],
+        'srcset': srcset(candidates['image']),
+        'webp_srcset': srcset(webp) if webp else None,
+        'sizes': CARD_SIZES,
+        'width': width,
+        'height': height,
+    }
+
+
+def srcset(candidates):
+    return ', '.join(f'{url} {width}w' for url, width in candidates)
+
+
+def card_images(posts):
+    """Контексты тега post_image для постов: {id поста: контекст}.
+
+    Готовые миниатюры всех постов читаются за один проход; недостающие
+    создаются, как это сделал бы тег {% thumbnail %}. У постов без
+    картинки или с картинкой, миниатюр которой не создать, контекст
+    пустой.
+    """
+    wanted = {}
+    missing_keys = {}
+    for post in posts:
+        if not post.image:
+            continue
+        missing_keys[post.pk] = _missing_key(post.image)
+        for field, extra in FIELDS.items():
+            image = getattr(post, field)
+            if not image:
+                continue
+            for width in card_widths(post.image_width):
+                thumbnail = _card_file(image, width, **extra)
+                wanted[(post.pk, field, width)] = add_prefix(thumbnail.key)
+    values = kvstore_cache().get_many(
+        [*missing_keys.values(), *wanted.values()])
+    unresolved = [raw for raw in wanted.values() if raw not in values]
+    if unresolved:
+        values.update(_fetch(unresolved))
+    found = {key: deserialize_image_file(values[raw])
+             for key, raw in wanted.items()
+             if values.get(raw) not in (None, EMPTY_VALUE)}
+    contexts = {}
+    for post in posts:
+        contexts[post.pk] = {}
+        if not post.image or values.get(missing_keys[post.pk]):
+            continue
+        try:
+            contexts[post.pk] = _card_image(
+                post, card_widths(post.image_width), found)
+        except Exception:
+            if thumbnail_settings.THUMBNAIL_DEBUG:
+                raise
+            logger.exception('Не удалось получить миниатюры поста %s',
+                             post.pk)
+            kvstore_cache().set(missing_keys[post.pk], True,
+                                MISSING_TIMEOUT)
+    return contexts
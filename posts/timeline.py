@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+
+from .models import AuthorStats, Follow, Post, TimelineEntry, User
+
+BATCH_SIZE = 500
+
+
+def is_celebrity(author_id):
+    """Автор слишком популярен, чтобы раскладывать его посты по лентам."""
+    return AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT).exists()
+
+
+def celebrity_ids(user):
+    """Популярные авторы, на которых подписан user."""
+    return list(Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).values_list('author_id', flat=True))
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = (Follow.objects.filter(author_id=post.author_id)
+                 .values_list('user_id', flat=True).iterator())
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers),
+        batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту свежие посты автора, на которого подписались."""
+    if is_celebrity(author_id):
+        return
+    posts = (Post.objects.filter(author_id=author_id)
+             .values_list('pk', 'pub_date')
+             [:settings.TIMELINE_BACKFILL_SIZE])
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+         for pk, pub_date in posts),
+        batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def backfill_many(author_id, user_ids):
+    """То же, что backfill, для многих новых подписчиков автора сразу.
+
+    Строки ленты не создаются в Python: на каждую пачку подписчиков
+    выполняется один INSERT ... SELECT. Нужно массовой загрузке, где
+    подписок сотни тысяч.
+    """
+    if not user_ids or is_celebrity(author_id):
+        return
+    ops = connection.ops
+    qn = ops.quote_name
+    entry = TimelineEntry._meta
+    columns = ', '.join(qn(entry.get_field(name).column)
+                        for name in ('user', 'post', 'pub_date'))
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        batch = user_ids[start:start + BATCH_SIZE]
+        placeholders = ', '.join(['%s'] * len(batch))
+        sql = (
+            f'{ops.insert_statement(ignore_conflicts=True)} '
+            f'{qn(entry.db_table)} ({columns}) '
+            f'SELECT u.{qn(User._meta.pk.column)}, p.id, p.pub_date '
+            f'FROM {qn(User._meta.db_table)} u, '
+            f'(SELECT {qn("id")} AS id, {qn("pub_date")} AS pub_date '
+            f'FROM {qn(Post._meta.db_table)} WHERE {qn("author_id")} = %s '
+            f'ORDER BY {qn("pub_date")} DESC LIMIT %s) p '
+            f'WHERE u.{qn(User._meta.pk.column)} IN ({placeholders}) '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}')
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [author_id, settings.TIMELINE_BACKFILL_SIZE,
+                                 *batch])
+
+
+def trim(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    TimelineEntry.objects.filter(user_id=user_id,
+                                 post__author_id=author_id).delete()
+
+
+def refill(author_id):
+    """Раскладывает свежие посты автора по лентам всех подписчиков.
+
+    Нужно, когда автор перестал быть популярным: его посты больше не
+    подмешиваются при чтении, а написанные в популярности и подписки,
+    оформленные тогда же, в лентах не материализованы.
+    """
+    backfill_many(author_id, Follow.objects.filter(author_id=author_id)
+                  .values_list('user_id', flat=True))
+
+
+def refill_if_demoted(author_id):
+    """Вызывает refill, если автор только что опустился до предела."""
+    if AuthorStats.objects.filter(
+            user_id=author_id,
+            followers_count=settings.TIMELINE_FANOUT_LIMIT).exists():
+        refill(author_id)
+
+
+class FollowFeed:
+    """Лента подписок для KeysetPaginator с tiebreak='post_id'.
+
+    Страница читается из TimelineEntry по индексу (user, -pub_date,
+    -post) и сливается с постами популярных авторов по тому же ключу
+    (pub_date, post_id). Из каждого источника берётся не больше строк,
+    чем нужно странице, так что ленту целиком ничто не сортирует; сами
+    посты загружаются потом одним запросом по id.
+    """
+    model = TimelineEntry
+
+    def __init__(self, sources, ordering=('-pub_date', '-post_id')):
+        self.sources = sources
+        self.ordering = ordering
+
+    def filter(self, *args, **kwargs):
+        return FollowFeed([source.filter(*args, **kwargs)
+                           for source in self.sources], self.ordering)
+
+    def order_by(self, *ordering):
+        return FollowFeed(self.sources, ordering)
+
+    def __getitem__(self, index):
+        rows = set()
+        for source in self.sources:
+            rows.update(source.order_by(*self.ordering)
+                        .values_list('pub_date', 'post_id')[:index.stop])
+        descending = self.ordering[0].startswith('-')
+        ids = [pk for _, pk in sorted(rows, reverse=descending)
+               [index.start:index.stop]]
+        posts = Post.objects.with_feed_data().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def follow_feed(user):
+    """Лента подписок: материализованная лента плюс посты популярных
+    авторов, подмешанные при чтении."""
+    sources = [TimelineEntry.objects.filter(user=user)]
+    celebrities = celebrity_ids(user)
+    if celebrities:
+        sources.append(Post.objects.filter(author_id__in=celebrities)
+                       .annotate(post_id=F('pk')))
+    return FollowFeed(sources)
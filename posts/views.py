@@ -1,39 +1,125 @@
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.queries import query_budget
+
+from . import feed_cache, search, stats, timeline
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import AuthorStats, Follow, Group, Post, User
+from .paginator import KeysetPaginator
+
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+STATS_FIELDS = ('posts_count', 'followers_count', 'following_count')
+
+
+def paginate(request, post_list, **options):
+    paginator = KeysetPaginator(post_list, POSTS_PER_PAGE, **options)
+    page = paginator.get_page(after=request.GET.get('after'),
+                              before=request.GET.get('before'),
+                              number=request.GET.get('page'))
+    return paginator, page
+
+
+def viewer_scopes(request):
+    if request.user.is_authenticated:
+        return [f'follow:{request.user.pk}']
+    return []
+
+
+def index_scopes(request):
+    return ['all'], ''
+
+
+def group_scopes(request, slug):
+    group_id = (Group.objects.filter(slug=slug)
+                .values_list('pk', flat=True).first())
+    if group_id is None:
+        return None
+    return [f'group:{group_id}'], ''
+
+
+def profile_scopes(request, username):
+    stats = (AuthorStats.objects.filter(user__username=username)
+             .values_list('user_id', *STATS_FIELDS).first())
+    if stats is None:
+        return None
+    return [f'author:{stats[0]}', *viewer_scopes(request)], stats
 
 
+def post_scopes(request, username, post_id):
+    stats = (Post.objects.filter(author__username=username, id=post_id)
+             .values_list(*(f'author__stats__{field}'
+                            for field in STATS_FIELDS)).first())
+    if stats is None:
+        return None
+    return [f'post:{post_id}', *viewer_scopes(request)], stats
+
+
+def follow_scopes(request):
+    return ['all', *viewer_scopes(request)], ''
+
+
+@query_budget(5)
+@feed_cache.conditional(index_scopes)
 def index(request):
-    post_list = Post.objects.select_related('group')
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = Post.objects.with_feed_data()
+    paginator, page = paginate(request, post_list)
     return render(
         request,
         'index.html',
         {'page': page,
-         'paginator': paginator, }
+         'paginator': paginator,
+         **feed_cache.context(request, 'all'), }
     )
 
 
+@query_budget(6)
+@feed_cache.conditional(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = group.posts.with_feed_data()
+    paginator, page = paginate(request, post_list)
     return render(
         request,
         'group.html',
         {'group': group,
          'page': page,
-         'paginator': paginator, }
+         'paginator': paginator,
+         **feed_cache.context(request, f'group:{group.pk}'), }
     )
 
 
+@query_budget(6)
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    group_slug = request.GET.get('group') or None
+    username = request.GET.get('author') or None
+    group = author = None
+    if group_slug:
+        group = Group.objects.filter(slug=group_slug).first()
+    if username:
+        author = User.objects.filter(username=username).first()
+    if (group_slug and group is None) or (username and author is None):
+        page = search.SearchPage([], None)
+    else:
+        page = search.search(query,
+                             group_id=group.pk if group else None,
+                             author_id=author.pk if author else None,
+                             after=request.GET.get('after'))
+    next_query = request.GET.copy()
+    next_query['after'] = page.next_cursor or ''
+    return render(request, 'search.html', {
+        'query': query,
+        'group_slug': group_slug,
+        'username': username or '',
+        'groups': Group.objects.order_by('title').only('title', 'slug'),
+        'page': page,
+        'next_query': next_query.urlencode(),
+    })
+
+
 @login_required
 def new_post(request):
     form = PostForm(request.POST or None,
@@ -42,32 +128,42 @@ def new_post(request):
         return render(request, 'new_post.html', {'form': form})
     post_new = form.save(commit=False)
     post_new.author = request.user
-    post_new.save()
+    with transaction.atomic():
+        post_new.save()
     return redirect('posts:index')
 
 
+@query_budget(8)
+@feed_cache.conditional(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    author_posts = author.posts.all()
-    paginator = Paginator(author_posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    author_posts = author.posts.with_feed_data()
+    paginator, page = paginate(request, author_posts)
     follow = (request.user.is_authenticated and author != request.user
               and Follow.objects.filter(
                   author=author,
                   user=request.user).exists())
     context = {
         'author': author,
+        'stats': stats.for_author(author),
         'follow': follow,
         'page': page,
         'paginator': paginator,
+        **feed_cache.context(request, f'author:{author.pk}'),
     }
     return render(request, 'profile.html', context)
 
 
+@query_budget(8)
+@feed_cache.conditional(post_scopes)
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, id=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.with_feed_data().select_related('author__stats'),
+        author__username=username, id=post_id)
+    comments = KeysetPaginator(post.comments.select_related('author'),
+                               COMMENTS_PER_PAGE, key='-created').get_page(
+        after=request.GET.get('comments_after'))
     form = CommentForm()
     author = post.author
     follow = (request.user.is_authenticated and author != request.user
@@ -79,6 +175,7 @@ def post_view(request, username, post_id):
         'form': form,
         'comments': comments,
         'author': author,
+        'stats': stats.for_author(author),
         'follow': follow
     }
     return render(request, 'detailed_post.html', context)
@@ -118,15 +215,16 @@ def server_error(request):
     return render(request, 'misc/500.html', status=500)
 
 
+@query_budget(6)
 @login_required
+@feed_cache.conditional(follow_scopes)
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    paginator, page = paginate(request, timeline.follow_feed(request.user),
+                               tiebreak='post_id')
     return render(request, 'follow.html', {
         'page': page,
-        'paginator': paginator
+        'paginator': paginator,
+        **feed_cache.context(request, 'all', f'follow:{request.user.pk}'),
     })
 
 
@@ -136,15 +234,18 @@ def profile_follow(request, username):
     if (author != request.user
         and not Follow.objects.filter(user=request.user,
                                       author=author).exists()):
-        Follow.objects.create(
-            user=request.user,
-            author=author,
-        )
+        with transaction.atomic():
+            Follow.objects.create(
+                user=request.user,
+                author=author,
+            )
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    get_object_or_404(Follow, user=request.user,
-                      author__username=username).delete()
+    follow = get_object_or_404(Follow, user=request.user,
+                               author__username=username)
+    with transaction.atomic():
+        follow.delete()
     return redirect('posts:profile', username=username)
@@ -1,4 +1,13 @@
+import pytest
+
+from core import testing
+
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True, scope='session')
+def isolated_settings():
+    testing.isolate()
@@ -3,9 +3,10 @@ import tempfile
 
 import pytest
 from django.contrib.auth import get_user_model
-from django.core.paginator import Page, Paginator
 from django.db.models import fields
 
+from posts.paginator import KeysetPage, KeysetPaginator
+
 try:
     from posts.models import Post
 except ImportError:
@@ -111,12 +112,12 @@ class TestFollow:
         response = self.check_url(user_client, f'/follow', '/follow/')
         assert 'paginator' in response.context, \
             'Проверьте, что передали переменную `paginator` в контекст страницы `/follow/`'
-        assert type(response.context['paginator']) == Paginator, \
-            'Проверьте, что переменная `paginator` на странице `/follow/` типа `Paginator`'
+        assert type(response.context['paginator']) == KeysetPaginator, \
+            'Проверьте, что переменная `paginator` на странице `/follow/` типа `KeysetPaginator`'
         assert 'page' in response.context, \
             'Проверьте, что передали переменную `page` в контекст страницы `/follow/`'
-        assert type(response.context['page']) == Page, \
-            'Проверьте, что переменная `page` на странице `/follow/` типа `Page`'
+        assert type(response.context['page']) == KeysetPage, \
+            'Проверьте, что переменная `page` на странице `/follow/` типа `KeysetPage`'
         assert len(response.context['page']) == 2, \
             'Проверьте, что на странице `/follow/` список статей авторов на которых подписаны'
 
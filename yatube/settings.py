@@ -17,6 +17,7 @@ INSTALLED_APPS = [
     'users',
     'posts',
     'about',
+    'core',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -27,11 +28,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -39,12 +44,22 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+# Загрузчики убирают из шаблонов отступы (core.template_loaders); без
+# DEBUG загруженные шаблоны кэшируются, как при APP_DIRS.
+STRIP_WHITESPACE_LOADERS = [
+    'core.template_loaders.FilesystemLoader',
+    'core.template_loaders.AppDirectoriesLoader',
+]
+if not DEBUG:
+    STRIP_WHITESPACE_LOADERS = [('django.template.loaders.cached.Loader',
+                                 STRIP_WHITESPACE_LOADERS)]
+TEMPLATE_STRIP_WHITESPACE = True
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backend.TimedTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': STRIP_WHITESPACE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -57,6 +72,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Тесты не трогают файловый кэш и метрики разработчика (core.testing).
+TEST_RUNNER = 'core.testing.IsolatedTestRunner'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
@@ -95,6 +113,13 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+# collectstatic добавляет к именам хеш и пишет .gz-копии (core.staticfiles).
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+# Отдавать статику через фронтенд: 'X-Sendfile' (Apache, lighttpd) —
+# заголовок с путём к файлу, 'X-Accel-Redirect' (nginx) — с адресом
+# внутренней location STATIC_ACCEL_LOCATION.
+STATIC_SENDFILE = os.environ.get('STATIC_SENDFILE')
+STATIC_ACCEL_LOCATION = '/_static/'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -110,6 +135,44 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'default.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
     }
 }
+
+# Авторы, у которых подписчиков больше этого числа, не раскладываются
+# по лентам подписчиков при публикации: их посты подмешиваются при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+# Сколько последних постов автора попадает в ленту при подписке.
+TIMELINE_BACKFILL_SIZE = 1000
+
+# Фрагменты лент сбрасываются сигналами, поэтому могут жить долго.
+FEED_CACHE_TIMEOUT = 60 * 60
+# Сжатые тела страниц (core.compression) ищутся по хешу содержимого и
+# не устаревают; время жизни только освобождает место.
+COMPRESSION_CACHE_TIMEOUT = 60 * 60
+
+# Превышение бюджета запросов представления (core.queries.query_budget)
+# поднимает исключение вместо записи в лог.
+QUERY_BUDGET_RAISE = False
+# Столько одинаковых по форме запросов за запрос считается N+1.
+QUERY_REPEAT_THRESHOLD = 5
+
+# Профили запросов сотрудников (core.profiling) и сколько последних хранить.
+PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILE_KEEP = 100
+
+# Метрики процессов (core.metrics): каталог файлов, период их записи и
+# токен для /metrics/ помимо входа сотрудника.
+METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+METRICS_FLUSH_INTERVAL = 1.0
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+THUMBNAIL_ENGINE = 'core.thumbnails.TimedEngine'
+# Потоки, заранее создающие миниатюры новых картинок (posts.thumbnails);
+# 0 — создавать их сразу, в самом запросе.
+THUMBNAIL_WORKERS = 2
@@ -7,16 +7,16 @@ from django.urls import include, path
 urlpatterns = [
     path("auth/", include("users.urls")),
     path("auth/", include("django.contrib.auth.urls")),
+    path("", include("core.urls", namespace='core')),
     path("admin/", admin.site.urls),
     path("about/", include("about.urls", namespace='about')),
     path("", include("posts.urls", namespace='posts')),
 ]
 
+# Статику отдаёт core.views.static_file.
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL,
                           document_root=settings.MEDIA_ROOT)
-    urlpatterns += static(settings.STATIC_URL,
-                          document_root=settings.STATIC_ROOT)
 
 handler404 = "posts.views.page_not_found"  # noqa
 handler500 = "posts.views.server_error"  # noqa